@@ -0,0 +1,256 @@
+"""
+Benchmark the solver variants of standard.py on the large generator cases.
+
+Every case of large_test_case_generator.py is generated in-process, then
+each parser / engine / graph variant is run phase by phase (parse, build,
+propagate, validate, output). Wall time is the best of --repeat untraced
+runs; peak traced bytes come from one extra run under tracemalloc, and
+rss_delta_kb is the change in resident set size across the phase (Linux
+only, read from /proc/self/statm). The report is printed as JSON so
+results can be diffed across releases.
+
+Usage:
+    python misc/benchmark.py [--cases 1,3] [--parsers bulk] [--engines bfs,dsu]
+                             [--repeat 3] [--output bench.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import large_test_case_generator  # noqa: E402
+import standard  # noqa: E402
+
+# (engine, graph format) pairs; engines that build no graph use None.
+VARIANTS = [
+    ("bfs", "csr"),
+    ("bfs", "lists"),
+    ("dsu", None),
+]
+
+PHASES = ("parse", "build", "propagate", "validate", "output")
+
+
+def generator_cases():
+    """Return (number, name, function) for every caseN_* generator."""
+    cases = []
+    for name, function in vars(large_test_case_generator).items():
+        if name.startswith("case") and callable(function):
+            number = int(name[4:].split("_", 1)[0])
+            cases.append((number, name, function))
+    cases.sort()
+    return cases
+
+
+def generate_case(function):
+    """Capture what a generator function writes to stdout as input bytes."""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        function()
+    return buffer.getvalue().encode()
+
+
+STATM_PATH = Path("/proc/self/statm")
+
+
+def current_rss_kb():
+    """Resident set size right now, or None where /proc is unavailable.
+
+    resource.getrusage only reports the lifetime high-water mark, which
+    never goes down and so cannot be attributed to a single phase.
+    """
+    try:
+        resident_pages = int(STATM_PATH.read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+class PhaseRecorder:
+    """Run solver phases one by one and record what each of them costs."""
+
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.phases = {}
+
+    def run(self, phase, function, *args):
+        blocks_before = sys.getallocatedblocks()
+        rss_before = current_rss_kb()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+
+        record = {
+            "seconds": elapsed,
+            "allocated_blocks": sys.getallocatedblocks() - blocks_before,
+        }
+        rss_after = current_rss_kb()
+        if rss_before is not None and rss_after is not None:
+            record["rss_delta_kb"] = rss_after - rss_before
+        if self.trace_memory:
+            record["peak_traced_bytes"] = (
+                tracemalloc.get_traced_memory()[1] - traced_before
+            )
+        self.phases[phase] = record
+        return result
+
+
+def run_variant(data, parser, engine, graph_format, trace_memory):
+    """Solve one input with one variant and return (answer, phase records)."""
+    recorder = PhaseRecorder(trace_memory)
+    numbers = recorder.run("parse", standard.INTEGER_PARSERS[parser], data)
+    vertex_count, edge_count = numbers[0], numbers[1]
+
+    graph = None
+    if graph_format is not None:
+        graph = recorder.run(
+            "build",
+            standard.GRAPH_BUILDERS[graph_format],
+            vertex_count,
+            edge_count,
+            numbers,
+        )
+
+    if engine == "bfs":
+        is_consistent, shadow_values = recorder.run(
+            "propagate",
+            lambda: standard.compute_shadow_values(
+                vertex_count,
+                graph,
+                require_permutation=True,
+            ),
+        )
+    else:
+        is_consistent, shadow_values = recorder.run(
+            "propagate",
+            standard.compute_shadow_values_dsu,
+            vertex_count,
+            edge_count,
+            numbers,
+        )
+
+    ranks = None
+    if is_consistent:
+        ranks = recorder.run(
+            "validate",
+            standard.shadows_to_ranks,
+            vertex_count,
+            shadow_values,
+        )
+    answer = recorder.run("output", standard.format_answer, ranks)
+    return answer, recorder.phases
+
+
+def benchmark_variant(data, parser, engine, graph_format, repeat):
+    """Time a variant repeat times, then trace its memory once."""
+    best_phases = {}
+    answer = b""
+    for _ in range(repeat):
+        answer, phases = run_variant(data, parser, engine, graph_format, False)
+        for phase, record in phases.items():
+            best = best_phases.get(phase)
+            if best is None or record["seconds"] < best["seconds"]:
+                best_phases[phase] = record
+
+    tracemalloc.start()
+    try:
+        _, traced_phases = run_variant(data, parser, engine, graph_format, True)
+    finally:
+        tracemalloc.stop()
+    for phase, record in traced_phases.items():
+        best_phases[phase]["peak_traced_bytes"] = record["peak_traced_bytes"]
+
+    return {
+        "parser": parser,
+        "engine": engine,
+        "graph": graph_format,
+        "answer": "-1" if answer == b"-1" else "ranks",
+        "total_seconds": sum(
+            record["seconds"] for record in best_phases.values()
+        ),
+        "phases": {
+            phase: best_phases[phase] for phase in PHASES if phase in best_phases
+        },
+    }
+
+
+def parse_list(text):
+    return [item for item in text.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", default="", help="comma-separated case numbers")
+    parser.add_argument(
+        "--parsers",
+        default=",".join(sorted(standard.INTEGER_PARSERS)),
+        help="comma-separated parser names",
+    )
+    parser.add_argument(
+        "--engines",
+        default=",".join(sorted({engine for engine, _ in VARIANTS})),
+        help="comma-separated engine names",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per variant")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    options = parser.parse_args()
+
+    wanted_cases = {int(number) for number in parse_list(options.cases)}
+    parsers = parse_list(options.parsers)
+    engines = set(parse_list(options.engines))
+
+    results = []
+    for number, name, function in generator_cases():
+        if wanted_cases and number not in wanted_cases:
+            continue
+
+        data = generate_case(function)
+        for parser_name in parsers:
+            for engine, graph_format in VARIANTS:
+                if engine not in engines:
+                    continue
+                result = {"case": name, "input_bytes": len(data)}
+                result.update(
+                    benchmark_variant(
+                        data,
+                        parser_name,
+                        engine,
+                        graph_format,
+                        max(1, options.repeat),
+                    )
+                )
+                results.append(result)
+                print(
+                    f"{name} {parser_name} {engine} {graph_format}: "
+                    f"{result['total_seconds']:.3f}s",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
 
 import sys, random
+import argparse
+from array import array
+
+FAST_SHAPES = ("path", "star", "tree", "dense", "reverse")
+FAST_BLOCK_EDGES = 1 << 16
+PATH_CHORD_SPAN = 8
 
 def flush(buf):
     if buf:
@@ -211,5 +217,111 @@ def main():
         if idx != len(generators):
             sys.stdout.write("\n")
 
+# ---- Fast backend: one ledger of arbitrary size written straight to a file ----
+
+def random_vertices(n, count, rng):
+    # count uniform vertices in 1..n from one randbytes call (multiply-shift,
+    # bias below n / 2**32), much cheaper than randint per endpoint.
+    raw = array("I", rng.randbytes(4 * count))
+    return [(x * n >> 32) + 1 for x in raw]
+
+def fast_endpoints(shape, n, m, rng):
+    # Returns (us, vs) as int64 arrays; the first n-1 edges always span 1..n.
+    if shape == "star":
+        us = array("q", [1]) * (n - 1)
+        vs = array("q", range(2, n + 1))
+    elif shape == "tree":
+        # Random recursive tree: vertex i hangs off a uniform earlier vertex.
+        random_value = rng.random
+        us = array("q", [int(random_value() * i) + 1 for i in range(1, n)])
+        vs = array("q", range(2, n + 1))
+    elif shape == "reverse":
+        # Every path step twice, once per direction (like case8).
+        us = array("q", range(1, n))
+        vs = array("q", range(2, n + 1))
+        us, vs = us + vs, vs + us
+    else:
+        us = array("q", range(1, n))
+        vs = array("q", range(2, n + 1))
+
+    extra = m - len(us)
+    if extra > 0 and shape == "path":
+        # Local chords u -> u+2..u+PATH_CHORD_SPAN keep the path's narrow band.
+        chord_us = random_vertices(n - 1, extra, rng)
+        steps = random_vertices(PATH_CHORD_SPAN - 1, extra, rng)
+        us.extend(chord_us)
+        vs.extend(min(n, u + 1 + s) for u, s in zip(chord_us, steps))
+    elif extra > 0:
+        us.extend(random_vertices(n, extra, rng))
+        vs.extend(random_vertices(n, extra, rng))
+    elif extra < 0:
+        del us[m:], vs[m:]
+    return us, vs
+
+def write_edges(out, us, vs, ws):
+    # One %-format call per block of edges instead of one f-string per line.
+    for lo in range(0, len(us), FAST_BLOCK_EDGES):
+        hi = min(lo + FAST_BLOCK_EDGES, len(us))
+        flat = [0] * (3 * (hi - lo))
+        flat[0::3] = us[lo:hi]
+        flat[1::3] = vs[lo:hi]
+        flat[2::3] = ws[lo:hi]
+        out.write(b"%d %d %d\n" * (hi - lo) % tuple(flat))
+
+def generate_fast(out, n, m, shape="dense", seed=0, bad_edges=0, shuffle=False):
+    # Hidden ranks are 1..n (shuffled if asked), so w = rank[v] - rank[u] is
+    # consistent; bad_edges random edges are then pushed off by +1.
+    if shape not in FAST_SHAPES:
+        raise ValueError(f"unknown shape {shape!r}; expected one of {FAST_SHAPES}")
+    if n < 2:
+        raise ValueError("n must be >= 2")
+    spanning = 2 * (n - 1) if shape == "reverse" else n - 1
+    if m < spanning:
+        raise ValueError(f"shape {shape!r} needs m >= {spanning} to stay connected")
+    rng = random.Random(seed)
+
+    us, vs = fast_endpoints(shape, n, m, rng)
+    if shuffle:
+        ranks = list(range(1, n + 1))
+        rng.shuffle(ranks)
+        ranks.insert(0, 0)
+        rank_of = ranks.__getitem__
+        ws = array("q", [a - b for a, b in zip(map(rank_of, vs), map(rank_of, us))])
+    else:
+        ws = array("q", [v - u for u, v in zip(us, vs)])
+    for index in rng.sample(range(m), min(bad_edges, m)):
+        ws[index] += 1
+
+    out.write(b"%d %d\n" % (n, m))
+    write_edges(out, us, vs, ws)
+
+def fast_main(argv=None):
+    parser = argparse.ArgumentParser(description="Write one large ledger in bulk.")
+    parser.add_argument("--n", type=int, required=True, help="number of vertices")
+    parser.add_argument("--m", type=int, help="number of edges (default: spanning edges only)")
+    parser.add_argument("--shape", choices=FAST_SHAPES, default="dense")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bad-edges", type=int, default=0, help="edges made inconsistent")
+    parser.add_argument("--shuffle", action="store_true", help="random hidden ranks instead of 1..n")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    options = parser.parse_args(argv)
+
+    m = options.m
+    if m is None:
+        m = 2 * (options.n - 1) if options.shape == "reverse" else options.n - 1
+    out = open(options.output, "wb") if options.output else sys.stdout.buffer
+    try:
+        generate_fast(out, options.n, m, options.shape, options.seed,
+                      options.bad_edges, options.shuffle)
+    except ValueError as exc:
+        parser.error(str(exc))
+    finally:
+        if options.output:
+            out.close()
+
 if __name__ == "__main__":
-    main()
+    # No arguments keeps the original ten fixed cases on stdout.
+    if len(sys.argv) > 1:
+        fast_main()
+    else:
+        main()
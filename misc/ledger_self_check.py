@@ -0,0 +1,307 @@
+"""
+Randomized and fixture-based self-checks for standard.py.
+
+Five checks run in turn:
+
+  rollback  After random appends and rollbacks, a RollbackLedger must be in
+            exactly the state of a fresh ledger fed the same edge prefix.
+  bisect    find_first_offending_edge must agree with a linear scan that
+            re-solves every prefix from scratch.
+  batch     `standard.py --batch` must reproduce test_cases/batch/*.out, for
+            both the leading-T and the concatenated input formats, and the
+            process pool of solve_batch_parallel, forced on with
+            min_edges=0, must agree with the serial solve_batch on those
+            fixtures and on random batches.
+  merge     `standard.py --components` on Skolem pair ledgers (k two-vertex
+            components with spans 1..k) must report a feasible merge for
+            k = 8, infeasible for k = 7, and give up as undecided for k = 14
+            instead of searching for minutes.
+  cache     ResultCache must miss, hit from memory and from disk, evict the
+            least recently used file once --cache-size is exceeded and never
+            store an answer above the cap; a second `standard.py
+            --cache-dir` run must be a profiled hit with the same answer.
+
+Usage:
+    python misc/ledger_self_check.py [--iterations 2000] [--seed 1]
+"""
+
+import argparse
+import random
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import standard  # noqa: E402
+
+BATCH_DIR = ROOT / "test_cases" / "batch"
+
+
+def random_edges(rng):
+    """Return (n, flat edges) mixing consistent, contradictory and wide edges."""
+    n = rng.randint(2, 8)
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    ranks.insert(0, 0)
+
+    edges = []
+    for _ in range(rng.randint(1, 3 * n)):
+        u = rng.randint(1, n)
+        v = rng.randint(1, n)
+        w = ranks[v] - ranks[u]
+        roll = rng.random()
+        if roll < 0.08:
+            w += rng.choice((-1, 1))
+        elif roll < 0.12:
+            w += rng.choice((-n, n))
+        edges.extend((u, v, w))
+    return n, edges
+
+
+def ledger_state(ledger):
+    """Every slot that defines a ledger, for exact comparison."""
+    return (
+        list(ledger.parent),
+        list(ledger.potential),
+        list(ledger.size),
+        list(ledger.lowest),
+        list(ledger.highest),
+        [None if counts is None else dict(counts) for counts in ledger.offset_counts],
+        ledger.component_count,
+        ledger.edge_count,
+        ledger.consistent,
+        ledger.span,
+        ledger.duplicate_count,
+    )
+
+
+def fresh_state(n, edges, edge_count):
+    ledger = standard.RollbackLedger(n)
+    for index in range(edge_count):
+        ledger.add_edge(*edges[3 * index:3 * index + 3])
+    return ledger_state(ledger)
+
+
+def check_rollback(rng):
+    n, edges = random_edges(rng)
+    edge_total = len(edges) // 3
+    ledger = standard.RollbackLedger(n)
+    checkpoints = [(0, ledger.checkpoint())]
+    applied = 0
+
+    for _ in range(2 * edge_total):
+        if applied < edge_total and rng.random() < 0.6:
+            ledger.add_edge(*edges[3 * applied:3 * applied + 3])
+            applied += 1
+            checkpoints.append((applied, ledger.checkpoint()))
+            continue
+
+        applied, checkpoint = checkpoints[rng.randrange(len(checkpoints))]
+        ledger.rollback(checkpoint)
+        del checkpoints[applied + 1:]
+        if ledger_state(ledger) != fresh_state(n, edges, applied):
+            return f"rollback to {applied} edges diverged: n={n} edges={edges}"
+    return None
+
+
+def linear_first_offending_edge(n, edges):
+    for edge_count in range(1, len(edges) // 3 + 1):
+        ledger = standard.IncrementalLedger(n)
+        ledger.add_edges(iter(edges[:3 * edge_count]))
+        if not ledger.feasible:
+            return edge_count
+    return None
+
+
+def check_bisect(rng):
+    n, edges = random_edges(rng)
+    expected = linear_first_offending_edge(n, edges)
+    found = standard.find_first_offending_edge(n, edges)
+    if found != expected:
+        return f"bisect found {found}, linear scan {expected}: n={n} edges={edges}"
+    return None
+
+
+def random_batch(rng, case_count):
+    """Flat integers T, then case_count random ledgers."""
+    numbers = [case_count]
+    for _ in range(case_count):
+        n, edges = random_edges(rng)
+        numbers.extend((n, len(edges) // 3))
+        numbers.extend(edges)
+    return numbers
+
+
+def check_batch_pool(rng):
+    # The fixtures are far below PARALLEL_MIN_EDGES, so force the pool on.
+    batches = [
+        (
+            standard.INTEGER_PARSERS["bulk"](input_path.read_bytes()),
+            standard.has_case_count(input_path.read_bytes()),
+        )
+        for input_path in sorted(BATCH_DIR.glob("*.in"))
+    ]
+    batches.extend((random_batch(rng, 40), True) for _ in range(3))
+
+    failures = []
+    for numbers, with_case_count in batches:
+        expected = standard.solve_batch(numbers, with_case_count)
+        found = standard.solve_batch_parallel(
+            numbers,
+            with_case_count,
+            workers=2,
+            min_edges=0,
+        )
+        if found != expected:
+            failures.append(f"batch pool diverged from serial: {numbers}")
+    return failures
+
+
+def check_batch(rng):
+    failures = check_batch_pool(rng)
+    for input_path in sorted(BATCH_DIR.glob("*.in")):
+        expected = input_path.with_suffix(".out").read_bytes().strip()
+        for extra in ([], ["--workers", "2"]):
+            result = subprocess.run(
+                [sys.executable, str(ROOT / "standard.py"), "--batch", *extra],
+                stdin=input_path.open("rb"),
+                capture_output=True,
+                check=False,
+            )
+            if result.stdout.strip() != expected:
+                failures.append(f"batch {input_path.name} {' '.join(extra)}")
+    return failures
+
+
+SKOLEM_MERGE_STATUS = {
+    7: standard.MERGE_INFEASIBLE,
+    8: standard.MERGE_FEASIBLE,
+    14: standard.MERGE_UNDECIDED,
+}
+
+
+def skolem_ledger(k):
+    """Ledger of k disjoint edges 2i-1 -> 2i with weight i."""
+    lines = [f"{2 * k} {k}"]
+    lines.extend(f"{2 * i - 1} {2 * i} {i}" for i in range(1, k + 1))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def check_merge():
+    failures = []
+    for k, expected in SKOLEM_MERGE_STATUS.items():
+        result = subprocess.run(
+            [sys.executable, str(ROOT / "standard.py"), "--components"],
+            input=skolem_ledger(k),
+            capture_output=True,
+            timeout=60,
+            check=False,
+        )
+        merge_lines = [
+            line for line in result.stderr.decode().splitlines()
+            if line.startswith("merge: ")
+        ]
+        status = merge_lines[-1].split()[1] if merge_lines else None
+        if status != expected:
+            failures.append(f"merge skolem k={k}: {status}, expected {expected}")
+            continue
+
+        answer = result.stdout.split()
+        if expected == standard.MERGE_FEASIBLE:
+            ranks = list(map(int, answer))
+            if sorted(ranks) != list(range(1, 2 * k + 1)) or any(
+                ranks[2 * i - 1] - ranks[2 * i - 2] != i for i in range(1, k + 1)
+            ):
+                failures.append(f"merge skolem k={k}: bad ranks {ranks}")
+        elif answer != ([b"-1"] if expected == standard.MERGE_INFEASIBLE else []):
+            failures.append(f"merge skolem k={k}: unexpected answer {answer}")
+    return failures
+
+
+def check_cache():
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = standard.ResultCache(directory, max_bytes=10, memory_entries=1)
+        if cache.get("a") is not None:
+            failures.append("cache: empty cache did not miss")
+        cache.put("a", b"12345")
+        if cache.get("a") != b"12345":
+            failures.append("cache: no memory hit after put")
+
+        # mtime decides the eviction order, so keep the writes apart.
+        time.sleep(0.05)
+        cache.put("b", b"67890")
+        time.sleep(0.05)
+        if standard.ResultCache(directory, 10).get("a") != b"12345":
+            failures.append("cache: no disk hit from a fresh cache")
+        time.sleep(0.05)
+        cache.put("c", b"xyz")
+        fresh = standard.ResultCache(directory, 10)
+        if fresh.get("b") is not None:
+            failures.append("cache: least recently used entry not evicted")
+        if fresh.get("a") != b"12345" or fresh.get("c") != b"xyz":
+            failures.append("cache: recently used entries evicted")
+
+        cache.put("d", b"x" * 11)
+        if standard.ResultCache(directory, 10).get("d") is not None:
+            failures.append("cache: answer above --cache-size stored on disk")
+
+        input_path = sorted((ROOT / "test_cases").glob("*.in"))[0]
+        runs = [
+            subprocess.run(
+                [
+                    sys.executable,
+                    str(ROOT / "standard.py"),
+                    str(input_path),
+                    "--cache-dir",
+                    str(Path(directory) / "cli"),
+                    "--profile",
+                ],
+                capture_output=True,
+                check=False,
+            )
+            for _ in range(2)
+        ]
+        hits = [
+            json.loads(run.stderr.splitlines()[-1])["phases"][0].get("hit")
+            for run in runs
+        ]
+        expected = input_path.with_suffix(".out").read_bytes().strip()
+        if hits != [False, True] or any(
+            run.stdout.strip() != expected for run in runs
+        ):
+            failures.append(f"cache: CLI runs gave hits {hits}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    options = parser.parse_args()
+
+    rng = random.Random(options.seed)
+    failures = []
+    for check in (check_rollback, check_bisect):
+        for _ in range(options.iterations):
+            failure = check(rng)
+            if failure is not None:
+                failures.append(failure)
+                break
+    failures.extend(check_batch(rng))
+    failures.extend(check_merge())
+    failures.extend(check_cache())
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    print("False" if failures else "True")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
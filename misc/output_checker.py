@@ -1,7 +1,14 @@
 
 import os
+import re
+from array import array
+from operator import itemgetter
 from typing import Tuple, List, Optional
 
+# Strict output grammar for the fast path; anything it rejects goes to the
+# detailed checker, which produces the diagnostic message.
+_FAST_OUTPUT_RE = re.compile(r"-?[0-9]+(?:[ \n]-?[0-9]+)*\n?", re.ASCII)
+
 
 def _fail(msg: str) -> Tuple[bool, str]:
     return (False, msg)
@@ -192,7 +199,108 @@ def _parse_input_cases(input_text: str) -> Tuple[bool, Optional[List[Tuple[int,
     return False, None, f"{err}; also failed to parse as multi-testcase with T: {err2}"
 
 
+def _fast_case_bounds(in_vals: array) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    Mirror _parse_input_cases on already-parsed integers.
+    Returns (n, m, start index of the edge triples) per case, or None.
+    """
+    total = len(in_vals)
+    if total >= 2:
+        n, m = in_vals[0], in_vals[1]
+        if n >= 2 and m >= 0 and total == 2 + 3 * m:
+            return [(n, m, 2)]
+
+    T = in_vals[0]
+    if T < 1:
+        return None
+    bounds: List[Tuple[int, int, int]] = []
+    idx = 1
+    for _ in range(T):
+        if idx + 1 >= total:
+            return None
+        n, m = in_vals[idx], in_vals[idx + 1]
+        idx += 2
+        if n < 2 or m < 0 or idx + 3 * m > total:
+            return None
+        bounds.append((n, m, idx))
+        idx += 3 * m
+    if idx != total:
+        return None
+    return bounds
+
+
+def _fast_check(input_text: str, output_text: str) -> bool:
+    """
+    Bulk verification: parse both texts into int arrays, check each rank
+    block is a permutation by its distinct count and all constraints with one
+    batched lookup. Returns True only when the answer is certainly accepted;
+    False means "run the detailed checker", not "rejected".
+    """
+    if _FAST_OUTPUT_RE.fullmatch(output_text) is None or "-0" in output_text:
+        return False
+    # On ASCII text without '+' or '_', int() accepts exactly -?[0-9]+.
+    if not input_text.isascii() or "+" in input_text or "_" in input_text:
+        return False
+    try:
+        in_vals = array("q", map(int, input_text.split()))
+        out_vals = array("q", map(int, output_text.split()))
+    except (ValueError, OverflowError):
+        return False
+    if not in_vals:
+        return False
+
+    bounds = _fast_case_bounds(in_vals)
+    if bounds is None:
+        return False
+
+    ptr = 0
+    for n, m, start in bounds:
+        if ptr >= len(out_vals):
+            return False
+        if out_vals[ptr] == -1:
+            # Without "-0" in the text, the value -1 can only be the token "-1".
+            ptr += 1
+            continue
+        if ptr + n > len(out_vals):
+            return False
+
+        block = out_vals[ptr:ptr + n]
+        if min(block) < 1 or max(block) > n:
+            return False
+        if len(set(block)) != n:
+            return False
+
+        if m:
+            end = start + 3 * m
+            us = in_vals[start:end:3]
+            vs = in_vals[start + 1:end:3]
+            if min(min(us), min(vs)) < 1 or max(max(us), max(vs)) > n:
+                return False
+            ranks = [0]
+            ranks.extend(block)
+            # itemgetter returns a bare int instead of a tuple for one edge.
+            if m == 1:
+                lhs = [ranks[vs[0]] - ranks[us[0]]]
+            else:
+                lhs = [
+                    rv - ru
+                    for rv, ru in zip(itemgetter(*vs)(ranks), itemgetter(*us)(ranks))
+                ]
+            if lhs != in_vals[start + 2:end:3].tolist():
+                return False
+
+        ptr += n
+
+    return ptr == len(out_vals)
+
+
 def check(input_text: str, output_text: str) -> Tuple[bool, str]:
+    if _fast_check(input_text, output_text):
+        return True, "OK"
+    return _check_detailed(input_text, output_text)
+
+
+def _check_detailed(input_text: str, output_text: str) -> Tuple[bool, str]:
     ok, cases, err = _parse_input_cases(input_text)
     if not ok or cases is None:
         return _fail(err)
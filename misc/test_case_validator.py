@@ -4,6 +4,14 @@ import re
 
 INT_LINE_RE = re.compile(r"-?\d+(?: -?\d+)*\Z")
 
+STREAM_CHUNK_SIZE = 1 << 16
+# Byte patterns for the streaming mode; one fullmatch covers a whole block of lines.
+T_LINE_RE = re.compile(rb"-?[0-9]+")
+HEADER_LINE_RE = re.compile(rb"-?[0-9]+ -?[0-9]+")
+EDGE_BLOCK_RE = re.compile(rb"-?[0-9]+ -?[0-9]+ -?[0-9]+(?:\n-?[0-9]+ -?[0-9]+ -?[0-9]+)*")
+# ASCII line breaks that str.splitlines() also splits on; \r\n is folded first.
+LINE_BREAKS = bytes.maketrans(b"\r\x0b\x0c\x1c\x1d\x1e", b"\n\n\n\n\n\n")
+
 def is_strict_int_line(s: str) -> bool:
     # No leading/trailing whitespace, no tabs, no empty lines; only single spaces between ints.
     if s == "" or s != s.strip():
@@ -116,7 +124,119 @@ def validate_cases_with_T(lines):
         idx = idx2
     return idx == len(lines)
 
+class LineStream:
+    # Hands out complete lines from a binary stream, one chunk in memory at a time.
+    __slots__ = ("stream", "chunk_size", "lines", "pos", "tail", "eof")
+    def __init__(self, stream, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.lines = []
+        self.pos = 0
+        self.tail = b""
+        self.eof = False
+
+    def _fill(self) -> bool:
+        # Load the next chunk's complete lines; False once the stream is exhausted.
+        while self.pos >= len(self.lines):
+            if self.eof:
+                return False
+            chunk = self.stream.read(self.chunk_size)
+            data = self.tail + chunk
+            held = b""
+            if not chunk:
+                self.eof = True
+            elif data.endswith(b"\r"):
+                # Keep a split \r\n together for the next chunk.
+                data, held = data[:-1], b"\r"
+            lines = data.replace(b"\r\n", b"\n").translate(LINE_BREAKS).split(b"\n")
+            # At EOF a last line without a newline still counts, like splitlines().
+            tail = lines.pop()
+            if self.eof and tail:
+                lines.append(tail)
+            self.tail = b"" if self.eof else tail + held
+            self.lines = lines
+            self.pos = 0
+        return True
+
+    def next_line(self):
+        if not self._fill():
+            return None
+        line = self.lines[self.pos]
+        self.pos += 1
+        return line
+
+    def take_lines(self, count: int):
+        # Yields lists of lines totalling count; the last list is short at EOF.
+        while count > 0 and self._fill():
+            end = min(len(self.lines), self.pos + count)
+            block = self.lines[self.pos:end]
+            count -= end - self.pos
+            self.pos = end
+            yield block
+
+def stream_one_case(reader: LineStream, header: bytes) -> bool:
+    if HEADER_LINE_RE.fullmatch(header) is None:
+        return False
+    n_tok, m_tok = header.split(b" ")
+    n = int(n_tok); m = int(m_tok)
+    if not (2 <= n <= 2 * 10**5):
+        return False
+    if not (n - 1 <= m <= 2 * 10**5):
+        return False
+
+    dsu = DSU(n)
+    union = dsu.union
+    remaining = m
+    for block in reader.take_lines(m):
+        text = b"\n".join(block)
+        if EDGE_BLOCK_RE.fullmatch(text) is None:
+            return False
+        vals = list(map(int, text.split()))
+        us = vals[0::3]; vs = vals[1::3]; ws = vals[2::3]
+        if min(us) < 1 or max(us) > n or min(vs) < 1 or max(vs) > n:
+            return False
+        if min(ws) < -10**9 or max(ws) > 10**9:
+            return False
+        for u, v in zip(us, vs):
+            if u != v:
+                union(u - 1, v - 1)
+        remaining -= len(block)
+    if remaining:
+        return False
+
+    return dsu.cc == 1
+
+def validate_stream(stream, chunk_size: int = STREAM_CHUNK_SIZE) -> bool:
+    # Same verdict as main() on text input, but reads fixed-size chunks and keeps
+    # at most one chunk of lines plus one DSU alive. Only ASCII digits and line
+    # breaks are recognised.
+    reader = LineStream(stream, chunk_size)
+    first = reader.next_line()
+    if first is None:
+        return False
+
+    if T_LINE_RE.fullmatch(first) is not None:
+        T = int(first)
+        if T < 1:
+            return False
+        for _ in range(T):
+            header = reader.next_line()
+            if header is None or not stream_one_case(reader, header):
+                return False
+        return reader.next_line() is None
+
+    header = first
+    while header is not None:
+        if not stream_one_case(reader, header):
+            return False
+        header = reader.next_line()
+    return True
+
 def main():
+    if "--stream" in sys.argv[1:]:
+        print("True" if validate_stream(sys.stdin.buffer) else "False")
+        return
+
     data = sys.stdin.read()
     if data == "":
         print("False")
@@ -3,17 +3,43 @@ Compute a permutation of ranks satisfying directed difference constraints
 on a connected graph, or print -1 if impossible.
 """
 
+import argparse
+import hashlib
+import io
+import json
+import mmap
+import os
 import sys
-from collections import deque
+import time
+import tracemalloc
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import accumulate, chain, islice, repeat
+from multiprocessing.shared_memory import SharedMemory
+from typing import BinaryIO, ContextManager, Iterator, NamedTuple, TextIO
 
+STREAM_CHUNK_SIZE = 1 << 16
+FILE_CHUNK_SIZE = 1 << 16
+PARALLEL_MIN_EDGES = 100_000
+PROFILE_ENV_VAR = "BEACON_PROFILE"
+BINARY_LEDGER_MAGIC = b"BEACONL1"
+CACHE_MEMORY_ENTRIES = 64
+CACHE_DISK_BYTES = 64 << 20
+CACHE_FILE_SUFFIX = ".ans"
+MERGE_STEP_BUDGET = 200_000
 
-def read_all_integers() -> list[int]:
-    """Read all integers from standard input efficiently.
+
+def parse_integers_bytewise(data: bytes) -> list[int]:
+    """Parse all integers from a raw input buffer one byte at a time.
+
+    Args:
+        data: Raw input bytes.
 
     Returns:
         A list of integers in the order they appear in the input.
     """
-    data = sys.stdin.buffer.read()
     numbers: list[int] = []
 
     current_value = 0
@@ -42,99 +68,2433 @@ def read_all_integers() -> list[int]:
     return numbers
 
 
+def parse_integers_bulk(data: bytes) -> array:
+    """Parse all integers from a raw input buffer in one bulk pass.
+
+    The buffer is split on whitespace and every token is converted at C
+    level, which avoids the per-byte interpreter loop entirely.
+
+    Args:
+        data: Raw whitespace-separated input bytes.
+
+    Returns:
+        An int64 array of integers in the order they appear in the input.
+    """
+    return array("q", map(int, data.split()))
+
+
+INTEGER_PARSERS = {
+    "bulk": parse_integers_bulk,
+    "bytewise": parse_integers_bytewise,
+}
+
+
+def iter_integers(
+    stream: BinaryIO,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[int]:
+    """Lazily yield integers from a binary stream read in fixed-size chunks.
+
+    A token cut by a chunk boundary is carried over to the next chunk, so
+    only as much input is read as the consumer actually pulls.
+
+    Args:
+        stream: Binary stream with whitespace-separated integers.
+        chunk_size: Number of bytes requested per read.
+
+    Returns:
+        An iterator over the integers in the order they appear.
+    """
+    return chain.from_iterable(_iter_integer_chunks(stream, chunk_size))
+
+
+def _iter_integer_chunks(
+    stream: BinaryIO,
+    chunk_size: int,
+) -> Iterator[Iterator[int]]:
+    """Yield the complete integers of each chunk read from a stream.
+
+    Each chunk's integers come as a lazy map over its tokens, so a consumer
+    such as array.extend converts them without an intermediate int list.
+
+    Args:
+        stream: Binary stream with whitespace-separated integers.
+        chunk_size: Number of bytes requested per read.
+
+    Yields:
+        Iterators over integers, one per chunk.
+    """
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        tokens = (pending + chunk).split()
+        pending = b""
+        if tokens and not chunk[-1:].isspace():
+            pending = tokens.pop()
+
+        yield map(int, tokens)
+
+    if pending:
+        yield [int(pending)]
+
+
+def read_integers_from_file(
+    path: str,
+    chunk_size: int = FILE_CHUNK_SIZE,
+) -> array:
+    """Parse all integers of a ledger file through a memory map.
+
+    The file is mapped read-only and parsed one small chunk at a time
+    straight into an int64 array, so neither the whole raw text nor a list
+    of Python ints is ever held at once; beyond the array itself, only one
+    chunk's tokens are alive.
+
+    Args:
+        path: Path of the ledger file.
+        chunk_size: Number of mapped bytes parsed per step.
+
+    Returns:
+        An int64 array of integers in the order they appear in the file.
+    """
+    numbers = array("q")
+    with open(path, "rb") as ledger_file:
+        if not ledger_file.seek(0, 2):
+            return numbers
+
+        with mmap.mmap(
+            ledger_file.fileno(),
+            0,
+            access=mmap.ACCESS_READ,
+        ) as mapped_file:
+            for chunk_numbers in _iter_integer_chunks(mapped_file, chunk_size):
+                numbers.extend(chunk_numbers)
+
+    return numbers
+
+
+def read_all_integers() -> list[int]:
+    """Read all integers from standard input efficiently.
+
+    Returns:
+        A list of integers in the order they appear in the input.
+    """
+    return parse_integers_bytewise(sys.stdin.buffer.read())
+
+
+def read_all_integers_bulk() -> array:
+    """Read all integers from standard input with the bulk parser.
+
+    Returns:
+        An int64 array of integers in the order they appear in the input.
+    """
+    return parse_integers_bulk(sys.stdin.buffer.read())
+
+
+def write_binary_ledger(stream: BinaryIO, numbers: list[int] | array) -> None:
+    """Write one parsed ledger in the binary ledger format.
+
+    The format is little-endian and has no padding:
+
+        8 bytes      magic b"BEACONL1"
+        2 x int64    n, m
+        m x int32    u column
+        m x int32    v column
+        m x int64    w column
+
+    Args:
+        stream: Binary stream to write to.
+        numbers: Flat integers n, m, u1, v1, w1, ... of exactly one ledger.
+
+    Raises:
+        ValueError: If numbers does not hold exactly m edge triples.
+        OverflowError: If a vertex does not fit in int32.
+    """
+    vertex_count, edge_count = numbers[0], numbers[1]
+    end = 2 + 3 * edge_count
+    if edge_count < 0 or len(numbers) != end:
+        raise ValueError(
+            f"expected {end} integers for one ledger, got {len(numbers)}"
+        )
+
+    columns = (
+        array("q", (vertex_count, edge_count)),
+        array("i", numbers[2:end:3]),
+        array("i", numbers[3:end:3]),
+        array("q", numbers[4:end:3]),
+    )
+    stream.write(BINARY_LEDGER_MAGIC)
+    for column in columns:
+        if sys.byteorder == "big":
+            column.byteswap()
+        column.tofile(stream)
+
+
+def read_binary_ledger(path: str) -> array:
+    """Load a binary ledger written by write_binary_ledger.
+
+    The columns are read with array.fromfile, so no decimal text is parsed;
+    they are interleaved back into the flat layout the text parsers return.
+
+    Args:
+        path: Path of the binary ledger file.
+
+    Returns:
+        An int64 array n, m, u1, v1, w1, ... like read_integers_from_file.
+
+    Raises:
+        ValueError: If the file is not a complete binary ledger.
+    """
+    with open(path, "rb") as ledger_file:
+        file_size = os.fstat(ledger_file.fileno()).st_size
+        return _read_binary_ledger(ledger_file, file_size, path)
+
+
+def _read_binary_ledger(
+    ledger_file: BinaryIO,
+    file_size: int,
+    name: str,
+) -> array:
+    """Decode a binary ledger from an open stream positioned at its start.
+
+    The header is checked against file_size before any column is read, so
+    a corrupt edge count fails fast instead of allocating huge columns.
+
+    Args:
+        ledger_file: Binary stream holding the whole ledger.
+        file_size: Total number of bytes in the stream.
+        name: Name of the source used in error messages.
+
+    Returns:
+        An int64 array n, m, u1, v1, w1, ... like read_integers_from_file.
+
+    Raises:
+        ValueError: If the stream is not a complete binary ledger.
+    """
+    if ledger_file.read(len(BINARY_LEDGER_MAGIC)) != BINARY_LEDGER_MAGIC:
+        raise ValueError(f"{name} is not a binary ledger")
+
+    header = array("q")
+    try:
+        header.fromfile(ledger_file, 2)
+    except EOFError as error:
+        raise ValueError(f"{name} is a truncated binary ledger") from error
+    if sys.byteorder == "big":
+        header.byteswap()
+
+    # Per edge: two int32 vertices and one int64 weight.
+    edge_count = header[1]
+    expected_size = len(BINARY_LEDGER_MAGIC) + 16 + 16 * edge_count
+    if edge_count < 0 or file_size != expected_size:
+        raise ValueError(
+            f"{name} holds {file_size} bytes, but its header announces "
+            f"m = {edge_count} edges"
+        )
+
+    tail_vertices = array("i")
+    head_vertices = array("i")
+    weights = array("q")
+    try:
+        tail_vertices.fromfile(ledger_file, edge_count)
+        head_vertices.fromfile(ledger_file, edge_count)
+        weights.fromfile(ledger_file, edge_count)
+    except EOFError as error:
+        raise ValueError(f"{name} is a truncated binary ledger") from error
+
+    if sys.byteorder == "big":
+        for column in (tail_vertices, head_vertices, weights):
+            column.byteswap()
+
+    numbers = array("q", bytes(8 * (2 + 3 * edge_count)))
+    numbers[0:2] = header
+    numbers[2::3] = array("q", tail_vertices)
+    numbers[3::3] = array("q", head_vertices)
+    numbers[4::3] = weights
+    return numbers
+
+
+class CsrGraph(NamedTuple):
+    """Compressed sparse row form of the constraint graph.
+
+    The entries neighbors[i] and deltas[i] for offsets[u] <= i < offsets[u+1]
+    describe the pairs (v, delta) meaning s[v] = s[u] + delta.
+    """
+
+    offsets: array
+    neighbors: array
+    deltas: array
+
+
+def build_adjacency_list(
+    vertex_count: int,
+    edge_count: int,
+    numbers: list[int] | array,
+    start: int = 2,
+) -> list[list[tuple[int, int]]]:
+    """Build a list-of-lists adjacency from flat edge triples.
+
+    Args:
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        numbers: Flat integers holding the triples (u, v, w).
+        start: Index of the first edge triple in numbers.
+
+    Returns:
+        Adjacency lists of (v, delta) pairs, index 0 unused.
+    """
+    adjacency_list: list[list[tuple[int, int]]] = []
+    for _ in range(vertex_count + 1):
+        adjacency_list.append([])
+
+    position = start
+    for _ in range(edge_count):
+        from_vertex = numbers[position]
+        to_vertex = numbers[position + 1]
+        difference = numbers[position + 2]
+        position += 3
+
+        adjacency_list[from_vertex].append((to_vertex, difference))
+        adjacency_list[to_vertex].append((from_vertex, -difference))
+
+    return adjacency_list
+
+
+def build_csr_graph(
+    vertex_count: int,
+    edge_count: int,
+    numbers: list[int] | array,
+    start: int = 2,
+) -> CsrGraph:
+    """Build a CSR graph from flat edge triples with a counting sort.
+
+    Every edge (u, v, w) contributes (v, w) to the row of u and (u, -w)
+    to the row of v, so the graph holds 2m entries in three flat buffers.
+
+    Args:
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        numbers: Flat integers holding the triples (u, v, w).
+        start: Index of the first edge triple in numbers.
+
+    Returns:
+        The CSR graph.
+    """
+    stop = start + 3 * edge_count
+    from_vertices = numbers[start:stop:3]
+    to_vertices = numbers[start + 1:stop:3]
+    differences = numbers[start + 2:stop:3]
+
+    degrees = [0] * (vertex_count + 2)
+    for vertex in from_vertices:
+        degrees[vertex + 1] += 1
+    for vertex in to_vertices:
+        degrees[vertex + 1] += 1
+    offsets = array("q", accumulate(degrees))
+
+    entry_count = 2 * edge_count
+    neighbors = array("q", bytes(8 * entry_count))
+    deltas = array("q", bytes(8 * entry_count))
+    next_slot = offsets.tolist()
+
+    for from_vertex, to_vertex, difference in zip(
+        from_vertices,
+        to_vertices,
+        differences,
+    ):
+        slot = next_slot[from_vertex]
+        neighbors[slot] = to_vertex
+        deltas[slot] = difference
+        next_slot[from_vertex] = slot + 1
+
+        slot = next_slot[to_vertex]
+        neighbors[slot] = from_vertex
+        deltas[slot] = -difference
+        next_slot[to_vertex] = slot + 1
+
+    return CsrGraph(offsets, neighbors, deltas)
+
+
+def compact_edges(
+    vertex_count: int,
+    edge_count: int,
+    numbers: list[int] | array,
+    start: int = 2,
+) -> array | None:
+    """Drop duplicate, reversed and self-loop edges before solving.
+
+    Each edge is canonicalized to (min, max, signed w), so u v w and
+    v u -w become the same constraint, and keyed by the packed 64-bit
+    value min << 32 | max. A second constraint on a key with a different
+    weight, or a self-loop with w != 0, is a contradiction found without
+    building any graph.
+
+    Args:
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        numbers: Flat integers holding the triples (u, v, w).
+        start: Index of the first edge triple in numbers.
+
+    Returns:
+        An int64 array n, k, u1, v1, w1, ... of the k unique constraints
+        in first-seen order, or None if the constraints contradict each
+        other or name a vertex outside 1..n.
+    """
+    stop = start + 3 * edge_count
+    from_vertices = numbers[start:stop:3]
+    to_vertices = numbers[start + 1:stop:3]
+    differences = numbers[start + 2:stop:3]
+    if edge_count and (
+        min(from_vertices) < 1
+        or min(to_vertices) < 1
+        or max(from_vertices) > vertex_count
+        or max(to_vertices) > vertex_count
+    ):
+        return None
+
+    unique_differences: dict[int, int] = {}
+    known_difference = unique_differences.setdefault
+    for from_vertex, to_vertex, difference in zip(
+        from_vertices,
+        to_vertices,
+        differences,
+    ):
+        if from_vertex > to_vertex:
+            from_vertex, to_vertex = to_vertex, from_vertex
+            difference = -difference
+        elif from_vertex == to_vertex:
+            if difference:
+                return None
+            continue
+
+        key = from_vertex << 32 | to_vertex
+        if known_difference(key, difference) != difference:
+            return None
+
+    unique_count = len(unique_differences)
+    if unique_count == edge_count:
+        # Nothing was dropped, so the input triples are already unique.
+        compacted = array("q", (vertex_count, edge_count))
+        compacted.extend(numbers[start:stop])
+        return compacted
+
+    compacted = array("q", bytes(8 * (2 + 3 * unique_count)))
+    compacted[0] = vertex_count
+    compacted[1] = unique_count
+    compacted[2::3] = array("q", [key >> 32 for key in unique_differences])
+    compacted[3::3] = array(
+        "q",
+        [key & 0xFFFFFFFF for key in unique_differences],
+    )
+    compacted[4::3] = array("q", unique_differences.values())
+    return compacted
+
+
+FAILURE_VERTEX_RANGE = "vertex_out_of_range"
+FAILURE_INCONSISTENT = "inconsistent"
+FAILURE_DISCONNECTED = "disconnected"
+FAILURE_SPAN = "span_too_wide"
+FAILURE_DUPLICATE = "duplicate_shadow"
+
+
+class LedgerWorkspace:
+    """Scratch buffers reused across the BFS solves of several ledgers.
+
+    Vertices and shadow slots are marked with the current epoch instead of
+    True, so starting a new solve only bumps the epoch and never clears or
+    reallocates buffers that are already large enough. After a failed
+    solve, failure holds one of the FAILURE_* reasons. Setting
+    queue_high_water to 0 makes the BFS record its largest queue length.
+    """
+
+    __slots__ = (
+        "shadow_values",
+        "visit_marks",
+        "occupied_marks",
+        "bfs_queue",
+        "epoch",
+        "failure",
+        "queue_high_water",
+    )
+
+    def __init__(self) -> None:
+        self.shadow_values: list[int] = []
+        self.visit_marks: list[int] = []
+        self.occupied_marks: list[int] = []
+        self.bfs_queue: deque[int] = deque()
+        self.epoch = 0
+        self.failure: str | None = None
+        # None disables tracking the largest BFS queue length.
+        self.queue_high_water: int | None = None
+
+    def prepare(self, vertex_count: int, require_permutation: bool) -> int:
+        """Grow the buffers for a ledger of n vertices and start a new epoch.
+
+        Args:
+            vertex_count: Number of vertices n.
+            require_permutation: Whether the occupied shadow marks are needed.
+
+        Returns:
+            The epoch value marking vertices and slots of this solve.
+        """
+        missing = vertex_count + 1 - len(self.visit_marks)
+        if missing > 0:
+            self.shadow_values.extend([0] * missing)
+            self.visit_marks.extend([0] * missing)
+
+        if require_permutation:
+            missing = 2 * vertex_count - 1 - len(self.occupied_marks)
+            if missing > 0:
+                self.occupied_marks.extend([0] * missing)
+
+        self.bfs_queue.clear()
+        self.failure = None
+        if self.queue_high_water is not None:
+            self.queue_high_water = 0
+        self.epoch += 1
+        return self.epoch
+
+
 def compute_shadow_values(
     vertex_count: int,
-    adjacency_list: list[list[tuple[int, int]]],
+    adjacency_list: list[list[tuple[int, int]]] | CsrGraph,
+    require_permutation: bool = False,
+    workspace: LedgerWorkspace | None = None,
 ) -> tuple[bool, list[int]]:
     """Compute shadow values satisfying all difference constraints.
 
     The adjacency list contains entries (v, delta) meaning s[v] = s[u] + delta.
+    A CsrGraph holding the same entries is accepted as well; its rows are
+    scanned by index, so no per-row slices are allocated.
+
+    With require_permutation, the running minimum and maximum shadow and a
+    bitmap of occupied shadows are updated as each vertex leaves the queue,
+    and the search stops as soon as the span exceeds n-1 or two vertices
+    share a shadow, since neither can be shifted onto a permutation of 1..n.
 
     Args:
         vertex_count: Number of vertices n.
         adjacency_list: Graph representation with directed delta constraints.
+        require_permutation: Also reject shadows that are not a permutation
+            of a window of n consecutive integers.
+        workspace: Scratch buffers to reuse; a fresh one is used if omitted.
 
     Returns:
         A pair (is_consistent, shadow_values).
         If is_consistent is False, shadow_values is empty.
-        Otherwise shadow_values has length n+1 (index 0 unused).
+        Otherwise shadow_values has length n+1 (index 0 unused), or is the
+        workspace buffer, which may be longer, when a workspace is given.
     """
-    shadow_values = [0] * (vertex_count + 1)
-    visited = [False] * (vertex_count + 1)
+    if workspace is None:
+        workspace = LedgerWorkspace()
+
+    is_csr = isinstance(adjacency_list, CsrGraph)
+    if is_csr:
+        offsets, neighbors, deltas = adjacency_list
+
+    epoch = workspace.prepare(vertex_count, require_permutation)
+    shadow_values = workspace.shadow_values
+    visit_marks = workspace.visit_marks
+    occupied_marks = workspace.occupied_marks
+    bfs_queue = workspace.bfs_queue
+    track_queue = workspace.queue_high_water is not None
 
-    visited[1] = True
+    # Shadows stay within [-(n-1), n-1] while the span is at most n-1.
+    maximum_span = vertex_count - 1
+    minimum_shadow = maximum_shadow = 0
+    # Every marked vertex is queued once, so this counts the reached ones
+    # without scanning visit_marks, which may be sized for a larger ledger.
+    reached_count = 0
+
+    visit_marks[1] = epoch
     shadow_values[1] = 0
-    bfs_queue = deque([1])
+    bfs_queue.append(1)
 
     while bfs_queue:
+        if track_queue and len(bfs_queue) > workspace.queue_high_water:
+            workspace.queue_high_water = len(bfs_queue)
         current_vertex = bfs_queue.popleft()
+        reached_count += 1
         current_shadow = shadow_values[current_vertex]
 
-        for neighbor_vertex, delta in adjacency_list[current_vertex]:
-            expected_shadow = current_shadow + delta
-
-            if not visited[neighbor_vertex]:
-                visited[neighbor_vertex] = True
-                shadow_values[neighbor_vertex] = expected_shadow
-                bfs_queue.append(neighbor_vertex)
-                continue
+        if require_permutation:
+            if current_shadow < minimum_shadow:
+                minimum_shadow = current_shadow
+            elif current_shadow > maximum_shadow:
+                maximum_shadow = current_shadow
+            if maximum_shadow - minimum_shadow > maximum_span:
+                workspace.failure = FAILURE_SPAN
+                return False, []
 
-            if shadow_values[neighbor_vertex] != expected_shadow:
+            slot = current_shadow + maximum_span
+            if occupied_marks[slot] == epoch:
+                workspace.failure = FAILURE_DUPLICATE
                 return False, []
+            occupied_marks[slot] = epoch
+
+        # The two scans differ only in how a row's entries are read.
+        if is_csr:
+            for edge_index in range(
+                offsets[current_vertex],
+                offsets[current_vertex + 1],
+            ):
+                neighbor_vertex = neighbors[edge_index]
+                expected_shadow = current_shadow + deltas[edge_index]
+                if visit_marks[neighbor_vertex] != epoch:
+                    visit_marks[neighbor_vertex] = epoch
+                    shadow_values[neighbor_vertex] = expected_shadow
+                    bfs_queue.append(neighbor_vertex)
+                elif shadow_values[neighbor_vertex] != expected_shadow:
+                    workspace.failure = FAILURE_INCONSISTENT
+                    return False, []
+        else:
+            for neighbor_vertex, delta in adjacency_list[current_vertex]:
+                expected_shadow = current_shadow + delta
+                if visit_marks[neighbor_vertex] != epoch:
+                    visit_marks[neighbor_vertex] = epoch
+                    shadow_values[neighbor_vertex] = expected_shadow
+                    bfs_queue.append(neighbor_vertex)
+                elif shadow_values[neighbor_vertex] != expected_shadow:
+                    workspace.failure = FAILURE_INCONSISTENT
+                    return False, []
 
-    if not all(visited[1:]):
+    if reached_count != vertex_count:
+        workspace.failure = FAILURE_DISCONNECTED
         return False, []
 
     return True, shadow_values
 
 
-def main() -> None:
-    """Read input, solve the constraints, and print the required output."""
-    input_numbers = read_all_integers()
-    if len(input_numbers) < 2:
-        return
+def _find_root(
+    parent: list[int],
+    potential: list[int],
+    vertex: int,
+) -> tuple[int, int]:
+    """Find the root of a vertex in a weighted disjoint-set union.
 
-    vertex_count = input_numbers[0]
-    edge_count = input_numbers[1]
+    potential[x] stores s[x] - s[parent[x]]. The path to the root is
+    compressed so that every visited vertex points straight at the root.
 
-    adjacency_list: list[list[tuple[int, int]]] = []
-    for _ in range(vertex_count + 1):
-        adjacency_list.append([])
+    Args:
+        parent: Parent pointers of the disjoint-set forest.
+        potential: Shadow offsets relative to the parent.
+        vertex: Vertex whose root is requested.
+
+    Returns:
+        A pair (root, offset) where offset is s[vertex] - s[root].
+    """
+    path: list[int] = []
+    while parent[vertex] != vertex:
+        path.append(vertex)
+        vertex = parent[vertex]
+
+    root = vertex
+    offset = 0
+    for path_vertex in reversed(path):
+        offset += potential[path_vertex]
+        potential[path_vertex] = offset
+        parent[path_vertex] = root
+
+    return root, offset
+
+
+def compute_shadow_values_dsu(
+    vertex_count: int,
+    edge_count: int,
+    numbers: list[int] | array,
+    start: int = 2,
+) -> tuple[bool, list[int]]:
+    """Compute shadow values with a weighted disjoint-set union.
+
+    Edges are consumed one by one straight from the flat integer stream,
+    so no adjacency is ever built and the first contradictory edge stops
+    the scan immediately.
 
-    position = 2
+    Args:
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        numbers: Flat integers holding the triples (u, v, w).
+        start: Index of the first edge triple in numbers.
+
+    Returns:
+        The same (is_consistent, shadow_values) pair as compute_shadow_values,
+        with shadow_values[1] equal to 0.
+    """
+    parent = list(range(vertex_count + 1))
+    potential = [0] * (vertex_count + 1)
+    size = [1] * (vertex_count + 1)
+    component_count = vertex_count
+
+    position = start
     for _ in range(edge_count):
-        from_vertex = input_numbers[position]
-        to_vertex = input_numbers[position + 1]
-        difference = input_numbers[position + 2]
+        from_vertex = numbers[position]
+        to_vertex = numbers[position + 1]
+        difference = numbers[position + 2]
         position += 3
 
-        adjacency_list[from_vertex].append((to_vertex, difference))
-        adjacency_list[to_vertex].append((from_vertex, -difference))
+        from_root, from_offset = _find_root(parent, potential, from_vertex)
+        to_root, to_offset = _find_root(parent, potential, to_vertex)
+
+        if from_root == to_root:
+            if to_offset - from_offset != difference:
+                return False, []
+            continue
+
+        if size[from_root] < size[to_root]:
+            parent[from_root] = to_root
+            potential[from_root] = to_offset - from_offset - difference
+            size[to_root] += size[from_root]
+        else:
+            parent[to_root] = from_root
+            potential[to_root] = from_offset - to_offset + difference
+            size[from_root] += size[to_root]
+        component_count -= 1
+
+    if component_count != 1:
+        return False, []
+
+    shadow_values = [0] * (vertex_count + 1)
+    for vertex in range(1, vertex_count + 1):
+        shadow_values[vertex] = _find_root(parent, potential, vertex)[1]
 
-    is_consistent, shadow_values = compute_shadow_values(
-        vertex_count,
-        adjacency_list,
+    base_shadow = shadow_values[1]
+    if base_shadow:
+        for vertex in range(1, vertex_count + 1):
+            shadow_values[vertex] -= base_shadow
+
+    return True, shadow_values
+
+
+class IncrementalLedger:
+    """Ledger that accepts edge appends without re-solving.
+
+    Vertices live in a weighted disjoint-set union where potential[x] is
+    s[x] - s[parent[x]]. Every root also keeps the lowest and highest
+    shadow offset of its members and a count of members per offset, which
+    are merged smaller-into-larger, so add_edge runs in near-constant
+    amortized time while the consistency status, the widest component
+    span and the number of duplicate shadows stay current.
+    """
+
+    __slots__ = (
+        "vertex_count",
+        "parent",
+        "potential",
+        "size",
+        "lowest",
+        "highest",
+        "offset_counts",
+        "component_count",
+        "edge_count",
+        "consistent",
+        "span",
+        "duplicate_count",
     )
-    if not is_consistent:
-        sys.stdout.write("-1")
-        return
 
-    shadow_list = shadow_values[1:]
-    minimum_shadow = min(shadow_list)
-    maximum_shadow = max(shadow_list)
+    def __init__(self, vertex_count: int) -> None:
+        self.vertex_count = vertex_count
+        self.parent = list(range(vertex_count + 1))
+        self.potential = [0] * (vertex_count + 1)
+        self.size = [1] * (vertex_count + 1)
+        self.lowest = [0] * (vertex_count + 1)
+        self.highest = [0] * (vertex_count + 1)
+        # Singleton components keep None instead of the counts {0: 1}.
+        self.offset_counts: list[dict[int, int] | None] = [None] * (
+            vertex_count + 1
+        )
+        self.component_count = vertex_count
+        self.edge_count = 0
+        self.consistent = True
+        self.span = 0
+        self.duplicate_count = 0
 
-    if maximum_shadow - minimum_shadow != vertex_count - 1:
-        sys.stdout.write("-1")
-        return
+    @property
+    def feasible(self) -> bool:
+        """Whether some future edges could still complete a permutation."""
+        return (
+            self.consistent
+            and self.span < self.vertex_count
+            and not self.duplicate_count
+        )
+
+    def _find(self, vertex: int) -> tuple[int, int]:
+        """Return the root of a vertex and its shadow offset from the root."""
+        return _find_root(self.parent, self.potential, vertex)
+
+    def add_edge(self, from_vertex: int, to_vertex: int, difference: int) -> bool:
+        """Append the constraint s[to_vertex] - s[from_vertex] = difference.
+
+        An edge contradicting its component marks the ledger inconsistent
+        and is not merged.
+
+        Args:
+            from_vertex: Vertex u of the edge.
+            to_vertex: Vertex v of the edge.
+            difference: Weight w of the edge.
+
+        Returns:
+            The feasible status after the edge was added.
+        """
+        self.edge_count += 1
+        from_root, from_offset = self._find(from_vertex)
+        to_root, to_offset = self._find(to_vertex)
+
+        if from_root == to_root:
+            if to_offset - from_offset != difference:
+                self.consistent = False
+        else:
+            root_shift = from_offset - to_offset + difference
+            if self.size[from_root] < self.size[to_root]:
+                self._merge(to_root, from_root, -root_shift)
+            else:
+                self._merge(from_root, to_root, root_shift)
+
+        return self.feasible
+
+    def add_edges(self, edge_values: Iterator[int]) -> bool:
+        """Append edges from flat (u, v, w) triples until one is infeasible.
+
+        This is the bulk form of add_edge. It stops pulling triples as soon
+        as the ledger becomes infeasible, so an iterator over the input is
+        left unread past the first provable failure.
+
+        Args:
+            edge_values: Iterator over the flat integers u1, v1, w1, ...
+
+        Returns:
+            The feasible status after the last edge that was added.
+        """
+        find = self._find
+        size = self.size
+        vertex_count = self.vertex_count
+
+        for from_vertex, to_vertex, difference in zip(
+            edge_values,
+            edge_values,
+            edge_values,
+        ):
+            self.edge_count += 1
+            from_root, from_offset = find(from_vertex)
+            to_root, to_offset = find(to_vertex)
+
+            if from_root == to_root:
+                if to_offset - from_offset != difference:
+                    self.consistent = False
+                    return False
+                continue
+
+            root_shift = from_offset - to_offset + difference
+            if size[from_root] < size[to_root]:
+                self._merge(to_root, from_root, -root_shift)
+            else:
+                self._merge(from_root, to_root, root_shift)
+
+            if self.span >= vertex_count or self.duplicate_count:
+                return False
+
+        return self.feasible
+
+    def _merge(self, root: int, child: int, root_shift: int) -> None:
+        """Attach the component of child under root.
+
+        Args:
+            root: Root that stays a root; its component is the larger one.
+            child: Root of the component being attached.
+            root_shift: Shadow offset s[child] - s[root].
+        """
+        self.parent[child] = root
+        self.potential[child] = root_shift
+        self.size[root] += self.size[child]
+        self.component_count -= 1
+
+        lowest = min(self.lowest[root], self.lowest[child] + root_shift)
+        highest = max(self.highest[root], self.highest[child] + root_shift)
+        self.lowest[root] = lowest
+        self.highest[root] = highest
+        if highest - lowest > self.span:
+            self.span = highest - lowest
+
+        offset_counts = self.offset_counts
+        target_counts = offset_counts[root]
+        if target_counts is None:
+            target_counts = offset_counts[root] = {0: 1}
+
+        child_counts = offset_counts[child]
+        if child_counts is None:
+            present_count = target_counts.get(root_shift, 0)
+            if present_count:
+                self.duplicate_count += 1
+            target_counts[root_shift] = present_count + 1
+            return
+
+        for member_offset, member_count in child_counts.items():
+            shifted_offset = member_offset + root_shift
+            present_count = target_counts.get(shifted_offset, 0)
+            if present_count:
+                self.duplicate_count += 1
+            target_counts[shifted_offset] = present_count + member_count
+        offset_counts[child] = None
+
+    def ranks(self) -> list[int] | None:
+        """Return the current rank permutation, if the ledger admits one.
+
+        Returns:
+            The ranks of vertices 1..n, or None while the ledger is
+            infeasible or still has more than one component.
+        """
+        if self.component_count != 1 or not self.feasible:
+            return None
+
+        shift = 1 - self.lowest[self._find(1)[0]]
+        return [
+            self._find(vertex)[1] + shift
+            for vertex in range(1, self.vertex_count + 1)
+        ]
+
+
+class RollbackLedger(IncrementalLedger):
+    """IncrementalLedger whose edge appends can be undone.
+
+    Paths are never compressed, so every change made by add_edge is a
+    handful of slot writes that are logged and undone in reverse order.
+    Union by size keeps _find logarithmic without compression.
+    """
+
+    __slots__ = ("history",)
+
+    def __init__(self, vertex_count: int) -> None:
+        super().__init__(vertex_count)
+        self.history: list[tuple] = []
+
+    def _find(self, vertex: int) -> tuple[int, int]:
+        """Return the root of a vertex and its offset without compression."""
+        parent = self.parent
+        potential = self.potential
+        offset = 0
+        while parent[vertex] != vertex:
+            offset += potential[vertex]
+            vertex = parent[vertex]
+        return vertex, offset
+
+    def add_edge(self, from_vertex: int, to_vertex: int, difference: int) -> bool:
+        """Append a constraint as in IncrementalLedger.add_edge and log it."""
+        self.history.append(
+            (self.edge_count, self.consistent, self.span, self.duplicate_count)
+        )
+        return super().add_edge(from_vertex, to_vertex, difference)
+
+    def add_edges(self, edge_values: Iterator[int]) -> bool:
+        """Append edges as in IncrementalLedger.add_edges and log them."""
+        for from_vertex, to_vertex, difference in zip(
+            edge_values,
+            edge_values,
+            edge_values,
+        ):
+            if not self.add_edge(from_vertex, to_vertex, difference):
+                return False
+
+        return self.feasible
+
+    def _merge(self, root: int, child: int, root_shift: int) -> None:
+        """Attach child under root as in IncrementalLedger and log it."""
+        self.history.append(
+            (
+                root,
+                child,
+                root_shift,
+                self.lowest[root],
+                self.highest[root],
+                self.offset_counts[root],
+                self.offset_counts[child],
+            )
+        )
+        super()._merge(root, child, root_shift)
+
+    def checkpoint(self) -> int:
+        """Return a token for the current state to pass to rollback."""
+        return len(self.history)
+
+    def rollback(self, checkpoint: int) -> None:
+        """Undo every edge appended since the given checkpoint.
+
+        Args:
+            checkpoint: Value returned by an earlier call to checkpoint.
+        """
+        history = self.history
+        while len(history) > checkpoint:
+            entry = history.pop()
+            if len(entry) == 4:
+                (
+                    self.edge_count,
+                    self.consistent,
+                    self.span,
+                    self.duplicate_count,
+                ) = entry
+                continue
+
+            (
+                root,
+                child,
+                root_shift,
+                lowest,
+                highest,
+                target_counts,
+                child_counts,
+            ) = entry
+            self.parent[child] = child
+            self.potential[child] = 0
+            self.size[root] -= self.size[child]
+            self.component_count += 1
+            self.lowest[root] = lowest
+            self.highest[root] = highest
+            self.offset_counts[child] = child_counts
+
+            if target_counts is None:
+                self.offset_counts[root] = None
+                continue
+
+            for member_offset, member_count in (child_counts or {0: 1}).items():
+                shifted_offset = member_offset + root_shift
+                remaining_count = target_counts[shifted_offset] - member_count
+                if remaining_count:
+                    target_counts[shifted_offset] = remaining_count
+                else:
+                    del target_counts[shifted_offset]
+
+
+def find_first_offending_edge(
+    vertex_count: int,
+    edges: list[int] | array,
+) -> int | None:
+    """Bisect for the shortest edge prefix that is provably infeasible.
+
+    Infeasibility of a prefix (a contradiction, a span above n-1 or a
+    duplicate shadow) persists when edges are appended, so a binary search
+    over prefix lengths applies. The ledger is only ever extended from the
+    last feasible prefix and rolled back after an infeasible probe, which
+    appends O(m) edges in total instead of re-solving every candidate.
+
+    Args:
+        vertex_count: Number of vertices n.
+        edges: Flat integers u1, v1, w1, u2, v2, w2, ... of the m edges.
+
+    Returns:
+        The 1-based index of the edge that first makes the ledger
+        infeasible, or None if the whole ledger stays feasible.
+    """
+    edge_count = len(edges) // 3
+    ledger = RollbackLedger(vertex_count)
+    feasible_count = 0
+    infeasible_count = edge_count + 1
+    while infeasible_count - feasible_count > 1:
+        middle_count = (feasible_count + infeasible_count) // 2
+        checkpoint = ledger.checkpoint()
+        if ledger.add_edges(
+            islice(edges, 3 * feasible_count, 3 * middle_count)
+        ):
+            feasible_count = middle_count
+        else:
+            ledger.rollback(checkpoint)
+            infeasible_count = middle_count
+
+    if infeasible_count > edge_count:
+        return None
+
+    return infeasible_count
+
+
+def solve_edge_stream(
+    vertex_count: int,
+    edge_count: int,
+    integers: Iterator[int],
+) -> list[int] | None:
+    """Solve the ledger while edges are still being read.
+
+    Edges are appended to an IncrementalLedger. The answer is known to be
+    -1 as soon as the ledger becomes infeasible (an edge contradicts its
+    component, a component spans more than n-1, or two members of a
+    component share a shadow), and in that case the remaining input is
+    never pulled from the iterator.
+
+    Args:
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        integers: Iterator positioned at the first edge triple.
+
+    Returns:
+        The ranks of vertices 1..n, or None if no valid assignment exists.
+    """
+    ledger = IncrementalLedger(vertex_count)
+    if not ledger.add_edges(islice(integers, 3 * edge_count)):
+        return None
+
+    return ledger.ranks()
+
+
+def shadows_to_ranks(
+    vertex_count: int,
+    shadow_values: list[int],
+) -> list[int] | None:
+    """Shift shadow values onto ranks and check that they form a permutation.
+
+    After shifting the minimum shadow to rank 1, every rank is at least 1,
+    so the ranks are a permutation of 1..n exactly when none exceeds n and
+    all are distinct. Distinctness is checked by marking each rank in one
+    bytearray, without building a set or copying the shadow list.
+
+    Args:
+        vertex_count: Number of vertices n.
+        shadow_values: Shadow values with index 0 unused.
+
+    Returns:
+        The ranks of vertices 1..n, or None if they are not a permutation.
+    """
+    shift = 1 - min(islice(shadow_values, 1, vertex_count + 1))
+    ranks = list(
+        map(shift.__add__, islice(shadow_values, 1, vertex_count + 1))
+    )
+    if max(ranks) > vertex_count:
+        return None
+
+    seen = bytearray(vertex_count + 1)
+    deque(map(seen.__setitem__, ranks, repeat(1)), maxlen=0)
+    if seen.count(1) != vertex_count:
+        return None
+
+    return ranks
+
+
+class ConflictCertificate(NamedTuple):
+    """Concrete evidence that a ledger has no valid rank assignment.
+
+    For FAILURE_INCONSISTENT, vertices is a cycle v1, v2, ..., vk (closing
+    back to v1) whose edge weights sum to the nonzero weight. For
+    FAILURE_DUPLICATE, it is a pair of vertices with equal shadows. For
+    FAILURE_SPAN, it is a pair (low, high) whose shadows differ by weight,
+    more than n-1. For FAILURE_DISCONNECTED, it is one vertex unreachable
+    from vertex 1.
+    """
+
+    failure: str
+    vertices: list[int]
+    weight: int
+
+
+def find_conflict_certificate(
+    vertex_count: int,
+    graph: CsrGraph,
+) -> ConflictCertificate | None:
+    """Explain why a ledger has no valid rank assignment.
+
+    The BFS of compute_shadow_values with require_permutation is replayed
+    in the same order, this time recording parent pointers, depths and the
+    vertex behind every occupied shadow, so the certificate names the same
+    failure the solver reported. It is meant to run only after a failed
+    solve and adds nothing to the success path.
+
+    Args:
+        vertex_count: Number of vertices n.
+        graph: CSR graph with directed delta constraints.
+
+    Returns:
+        The certificate, or None if the ledger is actually solvable.
+    """
+    offsets, neighbors, deltas = graph
+    shadow_values = [0] * (vertex_count + 1)
+    parents = [0] * (vertex_count + 1)
+    depths = [-1] * (vertex_count + 1)
+    maximum_span = vertex_count - 1
+    shadow_owners = [0] * (2 * vertex_count - 1)
+    lowest_vertex = highest_vertex = 1
+
+    depths[1] = 0
+    bfs_queue = deque([1])
+
+    while bfs_queue:
+        current_vertex = bfs_queue.popleft()
+        current_shadow = shadow_values[current_vertex]
+
+        if current_shadow < shadow_values[lowest_vertex]:
+            lowest_vertex = current_vertex
+        elif current_shadow > shadow_values[highest_vertex]:
+            highest_vertex = current_vertex
+        span = shadow_values[highest_vertex] - shadow_values[lowest_vertex]
+        if span > maximum_span:
+            return ConflictCertificate(
+                FAILURE_SPAN,
+                [lowest_vertex, highest_vertex],
+                span,
+            )
+
+        slot = current_shadow + maximum_span
+        if shadow_owners[slot]:
+            return ConflictCertificate(
+                FAILURE_DUPLICATE,
+                [shadow_owners[slot], current_vertex],
+                0,
+            )
+        shadow_owners[slot] = current_vertex
+
+        for edge_index in range(
+            offsets[current_vertex],
+            offsets[current_vertex + 1],
+        ):
+            neighbor_vertex = neighbors[edge_index]
+            expected_shadow = current_shadow + deltas[edge_index]
+
+            if depths[neighbor_vertex] < 0:
+                shadow_values[neighbor_vertex] = expected_shadow
+                parents[neighbor_vertex] = current_vertex
+                depths[neighbor_vertex] = depths[current_vertex] + 1
+                bfs_queue.append(neighbor_vertex)
+            elif shadow_values[neighbor_vertex] != expected_shadow:
+                return ConflictCertificate(
+                    FAILURE_INCONSISTENT,
+                    _tree_cycle(parents, depths, current_vertex, neighbor_vertex),
+                    expected_shadow - shadow_values[neighbor_vertex],
+                )
+
+    for vertex in range(1, vertex_count + 1):
+        if depths[vertex] < 0:
+            return ConflictCertificate(FAILURE_DISCONNECTED, [vertex], 0)
+
+    return None
+
+
+def _tree_cycle(
+    parents: list[int],
+    depths: list[int],
+    from_vertex: int,
+    to_vertex: int,
+) -> list[int]:
+    """Close the BFS tree paths of an edge's endpoints into a cycle.
+
+    Args:
+        parents: BFS parent of every reached vertex.
+        depths: BFS depth of every reached vertex.
+        from_vertex: Endpoint u of the non-tree edge (u, v).
+        to_vertex: Endpoint v of the non-tree edge (u, v).
+
+    Returns:
+        The cycle from the common ancestor down to u, across to v and back
+        up towards the ancestor, with the ancestor listed once.
+    """
+    down_path = [from_vertex]
+    up_path = [to_vertex]
+    while depths[down_path[-1]] > depths[up_path[-1]]:
+        down_path.append(parents[down_path[-1]])
+    while depths[up_path[-1]] > depths[down_path[-1]]:
+        up_path.append(parents[up_path[-1]])
+    while down_path[-1] != up_path[-1]:
+        down_path.append(parents[down_path[-1]])
+        up_path.append(parents[up_path[-1]])
+
+    up_path.pop()
+    down_path.reverse()
+    return down_path + up_path
+
+
+def format_certificate(certificate: ConflictCertificate) -> str:
+    """Describe a conflict certificate in one human-readable line.
+
+    Args:
+        certificate: Certificate returned by find_conflict_certificate.
+
+    Returns:
+        The description without a trailing newline.
+    """
+    vertices = certificate.vertices
+    if certificate.failure == FAILURE_INCONSISTENT:
+        cycle = " -> ".join(map(str, vertices + vertices[:1]))
+        return f"inconsistent cycle {cycle} has weight {certificate.weight}"
+    if certificate.failure == FAILURE_DUPLICATE:
+        return f"vertices {vertices[0]} and {vertices[1]} share a shadow"
+    if certificate.failure == FAILURE_SPAN:
+        return (
+            f"vertices {vertices[0]} and {vertices[1]} differ by "
+            f"{certificate.weight}, more than n-1"
+        )
+    return f"vertex {vertices[0]} is not reachable from vertex 1"
+
+
+class PhaseProfiler:
+    """Per-phase wall time and traced memory peak of one solve.
+
+    Each phase yields a dict for the caller to fill with the counts it
+    processed. Profiling starts tracemalloc, which slows every phase down,
+    so it is opt-in. DISABLED_PROFILER only hands out throwaway dicts.
+    """
+
+    __slots__ = ("enabled", "records")
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.records: list[dict[str, object]] = []
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phase(self, name: str) -> ContextManager[dict[str, object]]:
+        """Return a context manager that measures the named phase."""
+        if not self.enabled:
+            return nullcontext({})
+        return self._measure(name)
+
+    @contextmanager
+    def _measure(self, name: str) -> Iterator[dict[str, object]]:
+        """Time one phase and record its traced memory peak.
+
+        Args:
+            name: Phase name stored under the "phase" key.
+
+        Yields:
+            The phase record, appended to records when the phase ends.
+        """
+        record: dict[str, object] = {"phase": name}
+        tracemalloc.reset_peak()
+        traced_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - started
+            record["peak_traced_bytes"] = (
+                tracemalloc.get_traced_memory()[1] - traced_before
+            )
+            self.records.append(record)
+
+    def emit(self, stream: TextIO) -> None:
+        """Write the collected phases as one JSON line to a text stream."""
+        if self.enabled:
+            stream.write(json.dumps({"phases": self.records}) + "\n")
+
+
+DISABLED_PROFILER = PhaseProfiler(enabled=False)
+
+SOLVER_ENGINES = ("bfs", "dsu")
+
+GRAPH_BUILDERS = {
+    "csr": build_csr_graph,
+    "lists": build_adjacency_list,
+}
+
+
+def solve_ledger(
+    vertex_count: int,
+    edge_count: int,
+    numbers: list[int] | array,
+    start: int = 2,
+    engine: str = "bfs",
+    graph_format: str = "csr",
+    workspace: LedgerWorkspace | None = None,
+    profiler: PhaseProfiler = DISABLED_PROFILER,
+) -> list[int] | None:
+    """Solve one ledger whose edge triples are stored in a flat buffer.
+
+    Args:
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        numbers: Flat integers holding the triples (u, v, w).
+        start: Index of the first edge triple in numbers.
+        engine: Name of the solver engine from SOLVER_ENGINES.
+        graph_format: Name of the graph builder used by the BFS engine.
+        workspace: Scratch buffers reused by the BFS engine.
+        profiler: Receives the build, propagate and validate phases.
+
+    Returns:
+        The ranks of vertices 1..n, or None if no valid assignment exists.
+    """
+    if engine == "dsu":
+        with profiler.phase("propagate") as record:
+            is_consistent, shadow_values = compute_shadow_values_dsu(
+                vertex_count,
+                edge_count,
+                numbers,
+                start,
+            )
+            record.update(vertices=vertex_count, edges=edge_count)
+    else:
+        with profiler.phase("build") as record:
+            build_graph = GRAPH_BUILDERS[graph_format]
+            graph = build_graph(vertex_count, edge_count, numbers, start)
+            record.update(vertices=vertex_count, edges=edge_count)
+
+        with profiler.phase("propagate") as record:
+            if profiler.enabled:
+                workspace = workspace or LedgerWorkspace()
+                workspace.queue_high_water = 0
+            is_consistent, shadow_values = compute_shadow_values(
+                vertex_count,
+                graph,
+                require_permutation=True,
+                workspace=workspace,
+            )
+            if profiler.enabled:
+                record["queue_high_water"] = workspace.queue_high_water
+            record.update(vertices=vertex_count, edges=edge_count)
+
+    if not is_consistent:
+        return None
+
+    with profiler.phase("validate") as record:
+        record["vertices"] = vertex_count
+        return shadows_to_ranks(vertex_count, shadow_values)
+
+
+def has_case_count(data: bytes) -> bool:
+    """Tell whether a batch input starts with a line holding only T.
+
+    Mirrors misc/test_case_validator.py: a first line with one integer is
+    a case count, while a first line with two integers starts the first of
+    several concatenated n m blocks.
+
+    Args:
+        data: Raw batch input bytes.
+
+    Returns:
+        True if the first line holds a single token.
+    """
+    first_line = data.lstrip().split(b"\n", 1)[0]
+    return len(first_line.split()) == 1
+
+
+def iter_ledgers(
+    numbers: list[int] | array,
+    with_case_count: bool,
+) -> Iterator[tuple[int, int, int]]:
+    """Locate the ledgers stored back to back in a flat integer buffer.
+
+    Args:
+        numbers: All integers of the batch input.
+        with_case_count: Whether numbers[0] is the number of cases T.
+
+    Yields:
+        Triples (n, m, start) where start indexes the first edge triple.
+    """
+    total = len(numbers)
+    if with_case_count:
+        remaining_cases = numbers[0] if total else 0
+        position = 1
+    else:
+        remaining_cases = -1
+        position = 0
+
+    while remaining_cases != 0 and position + 1 < total:
+        vertex_count = numbers[position]
+        edge_count = numbers[position + 1]
+        yield vertex_count, edge_count, position + 2
+
+        position += 2 + 3 * edge_count
+        remaining_cases -= 1
+
+
+def solve_batch(
+    numbers: list[int] | array,
+    with_case_count: bool,
+    engine: str = "bfs",
+    graph_format: str = "csr",
+    profiler: PhaseProfiler = DISABLED_PROFILER,
+) -> list[bytes]:
+    """Solve every ledger of a batch with one shared workspace.
+
+    Args:
+        numbers: All integers of the batch input.
+        with_case_count: Whether numbers[0] is the number of cases T.
+        engine: Name of the solver engine from SOLVER_ENGINES.
+        graph_format: Name of the graph builder used by the BFS engine.
+        profiler: Receives the phases of every ledger, each record tagged
+            with the 1-based ledger index.
+
+    Returns:
+        The formatted answer of each ledger, in input order.
+    """
+    workspace = LedgerWorkspace()
+    answers = []
+    ledgers = iter_ledgers(numbers, with_case_count)
+    for ledger_index, (vertex_count, edge_count, start) in enumerate(
+        ledgers,
+        start=1,
+    ):
+        first_record = len(profiler.records)
+        answers.append(
+            format_answer(
+                solve_ledger(
+                    vertex_count,
+                    edge_count,
+                    numbers,
+                    start,
+                    engine,
+                    graph_format,
+                    workspace,
+                    profiler,
+                )
+            )
+        )
+        for record in profiler.records[first_record:]:
+            record["ledger"] = ledger_index
+    return answers
+
+
+class LedgerResult(NamedTuple):
+    """Outcome of solving one ledger.
+
+    Exactly one field is set: ranks on success, otherwise failure holds one
+    of the FAILURE_* reasons.
+    """
+
+    ranks: list[int] | None
+    failure: str | None
+
+
+class RankLedgerSolver:
+    """In-process solver answering many ledgers without reallocating.
+
+    The BFS scratch buffers (shadow values, visit marks, occupied shadow
+    marks and the queue) live in one LedgerWorkspace that is kept between
+    calls and only grows to the largest ledger seen so far.
+    """
+
+    __slots__ = ("workspace",)
+
+    def __init__(self) -> None:
+        self.workspace = LedgerWorkspace()
+
+    def solve(
+        self,
+        vertex_count: int,
+        edges: list[int] | array | memoryview,
+    ) -> LedgerResult:
+        """Solve one ledger given as flat edge triples.
+
+        Args:
+            vertex_count: Number of vertices n.
+            edges: Flat integers u1, v1, w1, u2, v2, w2, ... of the m edges.
+
+        Returns:
+            The ranks of vertices 1..n, or the reason no assignment exists.
+
+        Raises:
+            ValueError: If vertex_count is below 1 or edges does not hold
+                whole (u, v, w) triples.
+        """
+        if vertex_count < 1:
+            raise ValueError(
+                f"vertex_count must be at least 1, got {vertex_count}"
+            )
+        if len(edges) % 3:
+            raise ValueError("edges must hold whole (u, v, w) triples")
+
+        edge_count = len(edges) // 3
+        if edge_count:
+            endpoints = edges[0::3], edges[1::3]
+            if min(map(min, endpoints)) < 1:
+                return LedgerResult(None, FAILURE_VERTEX_RANGE)
+            if max(map(max, endpoints)) > vertex_count:
+                return LedgerResult(None, FAILURE_VERTEX_RANGE)
+
+        graph = build_csr_graph(vertex_count, edge_count, edges, 0)
+        is_consistent, shadow_values = compute_shadow_values(
+            vertex_count,
+            graph,
+            require_permutation=True,
+            workspace=self.workspace,
+        )
+        if not is_consistent:
+            return LedgerResult(None, self.workspace.failure)
+
+        return LedgerResult(
+            shadows_to_ranks(vertex_count, shadow_values),
+            None,
+        )
+
+
+_worker_workspace: LedgerWorkspace | None = None
+
+
+def _initialize_worker() -> None:
+    """Give each worker process its own reusable workspace."""
+    global _worker_workspace
+    _worker_workspace = LedgerWorkspace()
+
+
+def _solve_shared_ledger(
+    memory_name: str,
+    number_count: int,
+    vertex_count: int,
+    edge_count: int,
+    start: int,
+    engine: str,
+    graph_format: str,
+) -> bytes:
+    """Solve one ledger whose integers live in a shared memory block.
+
+    Args:
+        memory_name: Name of the shared memory block holding the batch.
+        number_count: Number of int64 values stored in the block.
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        start: Index of the first edge triple in the block.
+        engine: Name of the solver engine from SOLVER_ENGINES.
+        graph_format: Name of the graph builder used by the BFS engine.
+
+    Returns:
+        The formatted answer of the ledger.
+    """
+    shared_memory = SharedMemory(name=memory_name)
+    numbers = shared_memory.buf[:8 * number_count].cast("q")
+    try:
+        ranks = solve_ledger(
+            vertex_count,
+            edge_count,
+            numbers,
+            start,
+            engine,
+            graph_format,
+            _worker_workspace,
+        )
+    finally:
+        numbers.release()
+        shared_memory.close()
+
+    return format_answer(ranks)
+
+
+def solve_batch_parallel(
+    numbers: list[int] | array,
+    with_case_count: bool,
+    engine: str = "bfs",
+    graph_format: str = "csr",
+    workers: int = 1,
+    profiler: PhaseProfiler = DISABLED_PROFILER,
+    min_edges: int = PARALLEL_MIN_EDGES,
+) -> list[bytes]:
+    """Solve the ledgers of a batch in a pool of worker processes.
+
+    The integers are copied once into a shared memory block, and each task
+    only carries the position of its ledger, so no edge lists are pickled.
+    Answers come back in input order. Batches with fewer than two ledgers
+    or fewer than min_edges edges in total are solved serially, and so is
+    every batch while profiling, since worker processes cannot report
+    their phases back.
+
+    Args:
+        numbers: All integers of the batch input.
+        with_case_count: Whether numbers[0] is the number of cases T.
+        engine: Name of the solver engine from SOLVER_ENGINES.
+        graph_format: Name of the graph builder used by the BFS engine.
+        workers: Maximum number of worker processes.
+        profiler: Receives the per-ledger phases of a serial solve.
+        min_edges: Total edge count from which the pool is worth starting.
+
+    Returns:
+        The formatted answer of each ledger, in input order.
+    """
+    ledgers = list(iter_ledgers(numbers, with_case_count))
+    total_edges = sum(edge_count for _, edge_count, _ in ledgers)
+    if (
+        workers <= 1
+        or len(ledgers) < 2
+        or total_edges < min_edges
+        or profiler.enabled
+    ):
+        return solve_batch(
+            numbers,
+            with_case_count,
+            engine,
+            graph_format,
+            profiler,
+        )
+
+    if not isinstance(numbers, array):
+        numbers = array("q", numbers)
+
+    shared_memory = SharedMemory(create=True, size=max(1, 8 * len(numbers)))
+    try:
+        shared_memory.buf[:8 * len(numbers)] = memoryview(numbers).cast("B")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(ledgers)),
+            initializer=_initialize_worker,
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _solve_shared_ledger,
+                    shared_memory.name,
+                    len(numbers),
+                    vertex_count,
+                    edge_count,
+                    start,
+                    engine,
+                    graph_format,
+                )
+                for vertex_count, edge_count, start in ledgers
+            ]
+            return [future.result() for future in futures]
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+MERGE_FEASIBLE = "feasible"
+MERGE_INFEASIBLE = "infeasible"
+MERGE_UNDECIDED = "undecided"
+
+
+class ComponentReport(NamedTuple):
+    """Relative shadows of one connected component.
+
+    offsets[i] is the shadow of vertices[i] minus the lowest shadow in the
+    component, so a consistent component spans max(offsets) ranks. offsets
+    is empty when the component's own constraints contradict each other.
+    """
+
+    vertices: list[int]
+    offsets: list[int]
+    span: int
+    consistent: bool
+
+
+def find_components(
+    vertex_count: int,
+    edge_count: int,
+    numbers: list[int] | array,
+    start: int = 2,
+) -> list[list[int]]:
+    """Group vertices into connected components with a disjoint-set union.
+
+    Args:
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        numbers: Flat integers holding the triples (u, v, w).
+        start: Index of the first edge triple in numbers.
+
+    Returns:
+        The components as ascending vertex lists, ordered by their
+        smallest vertex.
+    """
+    parent = list(range(vertex_count + 1))
+
+    def find(vertex: int) -> int:
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+
+    stop = start + 3 * edge_count
+    for from_vertex, to_vertex in zip(
+        numbers[start:stop:3],
+        numbers[start + 1:stop:3],
+    ):
+        from_root = find(from_vertex)
+        to_root = find(to_vertex)
+        if from_root != to_root:
+            parent[max(from_root, to_root)] = min(from_root, to_root)
+
+    members: dict[int, list[int]] = {}
+    for vertex in range(1, vertex_count + 1):
+        members.setdefault(find(vertex), []).append(vertex)
+    return list(members.values())
+
+
+def _solve_component(
+    graph: CsrGraph,
+    shadow_values: list[int],
+    vertices: list[int],
+) -> ComponentReport:
+    """Run the shadow BFS inside one component.
+
+    Components are disjoint, so calls for different components write
+    disjoint slots of the shared shadow_values list.
+
+    Args:
+        graph: CSR graph of the whole ledger.
+        shadow_values: Shared shadow buffer with one slot per vertex.
+        vertices: Members of the component, the first one used as source.
+
+    Returns:
+        The component's report.
+    """
+    offsets, neighbors, deltas = graph
+    source_vertex = vertices[0]
+    reached = {source_vertex}
+    shadow_values[source_vertex] = 0
+    bfs_queue = deque([source_vertex])
+
+    while bfs_queue:
+        current_vertex = bfs_queue.popleft()
+        current_shadow = shadow_values[current_vertex]
+        row_start = offsets[current_vertex]
+        row_stop = offsets[current_vertex + 1]
+
+        for neighbor_vertex, delta in zip(
+            neighbors[row_start:row_stop],
+            deltas[row_start:row_stop],
+        ):
+            expected_shadow = current_shadow + delta
+
+            if neighbor_vertex not in reached:
+                reached.add(neighbor_vertex)
+                shadow_values[neighbor_vertex] = expected_shadow
+                bfs_queue.append(neighbor_vertex)
+                continue
+
+            if shadow_values[neighbor_vertex] != expected_shadow:
+                return ComponentReport(vertices, [], 0, False)
+
+    component_shadows = [shadow_values[vertex] for vertex in vertices]
+    lowest_shadow = min(component_shadows)
+    component_offsets = [shadow - lowest_shadow for shadow in component_shadows]
+    return ComponentReport(
+        vertices,
+        component_offsets,
+        max(component_offsets),
+        True,
+    )
+
+
+def merge_components(
+    vertex_count: int,
+    reports: list[ComponentReport],
+    step_budget: int = MERGE_STEP_BUDGET,
+) -> tuple[str, list[int] | None]:
+    """Shift independent components so that together they form 1..n.
+
+    The lowest free rank must hold the lowest member of some component,
+    so the search places one component there at a time and backtracks on
+    a dead end. Components with identical offset patterns are
+    interchangeable and are tried only once per rank. The search is
+    iterative, so thousands of components do not hit the recursion limit.
+    Adversarial shapes such as Skolem pairs still make it exponential, so
+    it gives up as undecided once step_budget placements and backtracks
+    have been spent.
+
+    Args:
+        vertex_count: Number of vertices n.
+        reports: Reports of all components, covering every vertex once.
+        step_budget: Maximum number of placements plus backtracks.
+
+    Returns:
+        A pair (status, ranks) where status is MERGE_FEASIBLE,
+        MERGE_INFEASIBLE or MERGE_UNDECIDED, and ranks holds the ranks of
+        vertices 1..n when the merge is feasible and None otherwise.
+    """
+    if not all(report.consistent for report in reports):
+        return MERGE_INFEASIBLE, None
+
+    pattern_members: dict[tuple[int, ...], list[ComponentReport]] = {}
+    for report in reports:
+        pattern = tuple(sorted(report.offsets))
+        if len(set(pattern)) != len(pattern) or pattern[-1] >= vertex_count:
+            return MERGE_INFEASIBLE, None
+        pattern_members.setdefault(pattern, []).append(report)
+    patterns = list(pattern_members)
+
+    occupied = bytearray(vertex_count + 1)
+    occupied[0] = 1
+    placements: list[tuple[int, int, ComponentReport]] = []
+    free_rank = 1
+    first_pattern = 0
+    steps = 0
+
+    while True:
+        while free_rank <= vertex_count and occupied[free_rank]:
+            free_rank += 1
+        if free_rank > vertex_count:
+            break
+
+        steps += 1
+        if steps > step_budget:
+            return MERGE_UNDECIDED, None
+
+        for pattern_index in range(first_pattern, len(patterns)):
+            pattern = patterns[pattern_index]
+            if not pattern_members[pattern]:
+                continue
+            if free_rank + pattern[-1] > vertex_count:
+                continue
+            if any(occupied[free_rank + offset] for offset in pattern):
+                continue
+
+            for offset in pattern:
+                occupied[free_rank + offset] = 1
+            placements.append(
+                (free_rank, pattern_index, pattern_members[pattern].pop())
+            )
+            first_pattern = 0
+            break
+        else:
+            if not placements:
+                return MERGE_INFEASIBLE, None
+
+            free_rank, pattern_index, report = placements.pop()
+            pattern = patterns[pattern_index]
+            for offset in pattern:
+                occupied[free_rank + offset] = 0
+            pattern_members[pattern].append(report)
+            first_pattern = pattern_index + 1
+
+    ranks = [0] * vertex_count
+    for base_rank, _, report in placements:
+        for vertex, offset in zip(report.vertices, report.offsets):
+            ranks[vertex - 1] = base_rank + offset
+    return MERGE_FEASIBLE, ranks
+
+
+def solve_components(
+    vertex_count: int,
+    edge_count: int,
+    numbers: list[int] | array,
+    start: int = 2,
+) -> tuple[list[ComponentReport], str, list[int] | None]:
+    """Solve each connected component independently, then merge them.
+
+    Unlike solve_ledger, the graph may be disconnected. Components are
+    found with a disjoint-set union and solved one after another over one
+    CSR graph and one shadow buffer.
+
+    Args:
+        vertex_count: Number of vertices n.
+        edge_count: Number of edges m.
+        numbers: Flat integers holding the triples (u, v, w).
+        start: Index of the first edge triple in numbers.
+
+    Returns:
+        A triple (reports, status, ranks) with one report per component,
+        the merge status from merge_components, and the merged ranks of
+        vertices 1..n or None unless the merge is feasible.
+    """
+    graph = build_csr_graph(vertex_count, edge_count, numbers, start)
+    components = find_components(vertex_count, edge_count, numbers, start)
+    shadow_values = [0] * (vertex_count + 1)
+    reports = [
+        _solve_component(graph, shadow_values, vertices)
+        for vertices in components
+    ]
+    return (reports, *merge_components(vertex_count, reports))
+
+
+def format_component_report(index: int, report: ComponentReport) -> str:
+    """Describe one component report in one human-readable line.
+
+    Args:
+        index: 1-based position of the component.
+        report: Report returned by solve_components.
+
+    Returns:
+        The description without a trailing newline.
+    """
+    if not report.consistent:
+        return f"component {index}: {len(report.vertices)} vertices, inconsistent"
+
+    return (
+        f"component {index}: {len(report.vertices)} vertices, "
+        f"span {report.span}"
+    )
+
+
+def result_cache_key(raw_input: bytes, batch: bool) -> str:
+    """Hash raw input bytes into a result cache key.
+
+    The answer is unique, so engine and parser choices are not part of
+    the key; batch mode is, because it changes the whole output.
+
+    Args:
+        raw_input: Raw input bytes exactly as read.
+        batch: Whether the input is solved as a batch.
+
+    Returns:
+        A hex digest naming the cached answer.
+    """
+    mode = b"batch\n" if batch else b"single\n"
+    digest = hashlib.blake2b(mode, digest_size=16)
+    digest.update(raw_input)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU cache of final answers in memory and, optionally, on disk.
+
+    The memory layer is an OrderedDict of at most memory_entries answers.
+    The disk layer keeps one file per key under directory and evicts the
+    least recently used files (by mtime, refreshed on every hit) once they
+    exceed max_bytes in total.
+    """
+
+    __slots__ = ("memory", "memory_entries", "directory", "max_bytes")
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        max_bytes: int = CACHE_DISK_BYTES,
+        memory_entries: int = CACHE_MEMORY_ENTRIES,
+    ) -> None:
+        self.memory: OrderedDict[str, bytes] = OrderedDict()
+        self.memory_entries = memory_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        """Return the path of the disk entry for key.
+
+        Args:
+            key: Cache key from result_cache_key.
+
+        Returns:
+            The answer file path under directory.
+        """
+        return os.path.join(self.directory, key + CACHE_FILE_SUFFIX)
+
+    def _remember(self, key: str, answer: bytes) -> None:
+        """Store an answer in the memory layer as its most recent entry.
+
+        Args:
+            key: Cache key from result_cache_key.
+            answer: Answer bytes exactly as written to stdout.
+        """
+        self.memory[key] = answer
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached answer for key, or None on a miss."""
+        answer = self.memory.get(key)
+        if answer is not None:
+            self.memory.move_to_end(key)
+            return answer
+        if self.directory is None:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as answer_file:
+                answer = answer_file.read()
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, answer)
+        return answer
+
+    def put(self, key: str, answer: bytes) -> None:
+        """Store an answer, evicting least recently used entries."""
+        self._remember(key, answer)
+        if self.directory is None or len(answer) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as answer_file:
+            answer_file.write(answer)
+        os.replace(temporary_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Delete the oldest disk entries until they fit in max_bytes.
+
+        Entries are ordered by mtime, which every hit refreshes, so the
+        least recently used answers go first. Files removed by another
+        process in the meantime are skipped.
+        """
+        entries = []
+        total_bytes = 0
+        with os.scandir(self.directory) as directory_entries:
+            for entry in directory_entries:
+                if entry.name.endswith(CACHE_FILE_SUFFIX):
+                    status = entry.stat()
+                    entries.append(
+                        (status.st_mtime_ns, status.st_size, entry.path)
+                    )
+                    total_bytes += status.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+
+
+# Options that a mode returns before honouring, so combining them is an error.
+CONFLICTING_OPTIONS: dict[str, tuple[str, ...]] = {
+    "stream": (
+        "batch",
+        "components",
+        "compact",
+        "diagnose",
+        "to_binary",
+        "cache_dir",
+    ),
+    "batch": ("components", "compact", "diagnose"),
+    "components": ("diagnose", "cache_dir", "workers"),
+    "to_binary": ("batch", "components", "compact", "diagnose"),
+    # Only the answer is cached, not what these write besides it.
+    "cache_dir": ("diagnose", "to_binary"),
+}
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser for the solver options.
+
+    Returns:
+        The configured argument parser.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "input_file",
+        nargs="?",
+        help="ledger file to memory-map instead of reading stdin",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=sorted(INTEGER_PARSERS),
+        default="bulk",
+        help="integer parsing backend for stdin (default: bulk)",
+    )
+    parser.add_argument(
+        "--graph",
+        choices=sorted(GRAPH_BUILDERS),
+        default="csr",
+        help="constraint graph representation (default: csr)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=SOLVER_ENGINES,
+        default="bfs",
+        help="shadow value solver engine (default: bfs)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read edges in chunks and stop at the first provable -1",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=STREAM_CHUNK_SIZE,
+        help="bytes per read in streaming mode (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="solve a leading T cases or concatenated n m blocks",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker processes for --batch (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--components",
+        action="store_true",
+        help="solve components independently and merge them, "
+        "reporting each component on stderr",
+    )
+    parser.add_argument(
+        "--diagnose",
+        action="store_true",
+        help="explain a -1 answer with a conflict certificate on stderr",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="drop duplicate, reversed and self-loop edges before solving",
+    )
+    parser.add_argument(
+        "--to-binary",
+        metavar="PATH",
+        help="write the parsed ledger in the binary format to PATH and exit",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="PATH",
+        help="reuse answers of identical inputs stored under PATH",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=CACHE_DISK_BYTES,
+        help="byte cap of the --cache-dir answers (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="write per-phase timings as JSON to stderr "
+        f"(also enabled by {PROFILE_ENV_VAR}=1)",
+    )
+    return parser
+
+
+def reject_conflicting_options(
+    parser: argparse.ArgumentParser,
+    options: argparse.Namespace,
+) -> None:
+    """Exit with a usage error if a mode would silently drop an option.
+
+    An option counts as given when its value differs from the parser
+    default, so the check also covers options that take a value.
+
+    Args:
+        parser: Parser that produced options; reports the error.
+        options: Parsed command-line options.
+    """
+    for mode, dropped_options in CONFLICTING_OPTIONS.items():
+        if getattr(options, mode) == parser.get_default(mode):
+            continue
+        for name in dropped_options:
+            if getattr(options, name) != parser.get_default(name):
+                parser.error(
+                    f"--{mode.replace('_', '-')} cannot be combined with "
+                    f"--{name.replace('_', '-')}"
+                )
+
+
+def format_answer(ranks: list[int] | None) -> bytes:
+    """Format the ranks, or -1 when no valid assignment exists.
+
+    All ranks are rendered by a single bytes %-format call, which writes
+    the digits straight into the one output buffer instead of creating a
+    text object per rank and joining them afterwards.
+
+    Args:
+        ranks: Ranks of vertices 1..n, or None for an impossible ledger.
+
+    Returns:
+        The answer line without a trailing newline.
+    """
+    if ranks is None:
+        return b"-1"
+    if not ranks:
+        return b""
+
+    line_format = b"%d " * (len(ranks) - 1) + b"%d"
+    return line_format % tuple(ranks)
+
+
+def answer_stream(
+    integers: Iterator[int],
+    profiler: PhaseProfiler = DISABLED_PROFILER,
+) -> None:
+    """Solve a single ledger read incrementally and print the answer.
+
+    Reading and solving are interleaved, so they share one "stream" phase.
+
+    Args:
+        integers: Lazy iterator over the integers of the ledger, such as
+            iter_integers over a binary stream.
+        profiler: Receives the stream and output phases.
+    """
+    with profiler.phase("stream") as record:
+        header = list(islice(integers, 2))
+        ranks = None
+        if len(header) == 2:
+            vertex_count, edge_count = header
+            ranks = solve_edge_stream(vertex_count, edge_count, integers)
+            record.update(vertices=vertex_count, edges=edge_count)
+    if len(header) < 2:
+        return
+
+    with profiler.phase("output") as record:
+        answer = format_answer(ranks)
+        sys.stdout.buffer.write(answer)
+        record["bytes"] = len(answer)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Read input, solve the constraints, and print the required output.
+
+    Args:
+        argv: Command-line arguments; defaults to sys.argv[1:].
+    """
+    parser = build_argument_parser()
+    options = parser.parse_args(argv)
+    reject_conflicting_options(parser, options)
+
+    profiler = DISABLED_PROFILER
+    if options.profile or os.environ.get(PROFILE_ENV_VAR, "0") != "0":
+        profiler = PhaseProfiler()
+
+    if options.stream:
+        if options.input_file is None:
+            answer_stream(
+                iter_integers(sys.stdin.buffer, options.chunk_size),
+                profiler,
+            )
+        else:
+            with open(options.input_file, "rb") as ledger_file:
+                magic = ledger_file.read(len(BINARY_LEDGER_MAGIC))
+                ledger_file.seek(0)
+                if magic == BINARY_LEDGER_MAGIC:
+                    # Binary columns hold no text to stop parsing early in.
+                    try:
+                        integers = iter(read_binary_ledger(options.input_file))
+                    except ValueError as error:
+                        parser.error(str(error))
+                else:
+                    integers = iter_integers(ledger_file, options.chunk_size)
+                answer_stream(integers, profiler)
+        profiler.emit(sys.stderr)
+        return
+
+    cache = None
+    cache_key = None
+    raw_input = None
+    if options.cache_dir is not None:
+        cache = ResultCache(options.cache_dir, options.cache_size)
+        with profiler.phase("cache") as record:
+            if options.input_file is None:
+                raw_input = sys.stdin.buffer.read()
+            else:
+                with open(options.input_file, "rb") as ledger_file:
+                    raw_input = ledger_file.read()
+            cache_key = result_cache_key(raw_input, options.batch)
+            cached_answer = cache.get(cache_key)
+            record["hit"] = cached_answer is not None
+        if cached_answer is not None:
+            sys.stdout.buffer.write(cached_answer)
+            profiler.emit(sys.stderr)
+            return
+
+    with profiler.phase("parse") as record:
+        # A cache miss already holds the whole input: never read it twice.
+        data = raw_input
+        if data is None and options.input_file is None:
+            data = sys.stdin.buffer.read()
+        elif data is None:
+            # Only the first line is needed to detect a leading T.
+            with open(options.input_file, "rb") as ledger_file:
+                data = ledger_file.read(4096)
+
+        if options.input_file is not None and data.startswith(
+            BINARY_LEDGER_MAGIC
+        ):
+            try:
+                if raw_input is None:
+                    input_numbers = read_binary_ledger(options.input_file)
+                else:
+                    input_numbers = _read_binary_ledger(
+                        io.BytesIO(raw_input),
+                        len(raw_input),
+                        options.input_file,
+                    )
+            except ValueError as error:
+                parser.error(str(error))
+            # A binary file holds exactly one ledger, never a leading T.
+            data = b""
+        elif raw_input is None and options.input_file is not None:
+            input_numbers = read_integers_from_file(options.input_file)
+        else:
+            input_numbers = INTEGER_PARSERS[options.parser](data)
+        record["integers"] = len(input_numbers)
+
+    if options.to_binary is not None:
+        try:
+            with open(options.to_binary, "wb") as binary_file:
+                write_binary_ledger(binary_file, input_numbers)
+        except ValueError as error:
+            # The ledger is validated before any byte is written.
+            os.remove(options.to_binary)
+            parser.error(f"--to-binary needs exactly one ledger: {error}")
+        return
+
+    if options.batch:
+        answers = solve_batch_parallel(
+            input_numbers,
+            has_case_count(data),
+            options.engine,
+            options.graph,
+            options.workers,
+            profiler,
+        )
+        with profiler.phase("output") as record:
+            answer = b"\n".join(answers)
+            sys.stdout.buffer.write(answer)
+            record.update(ledgers=len(answers), bytes=len(answer))
+        if cache is not None:
+            cache.put(cache_key, answer)
+        profiler.emit(sys.stderr)
+        return
+
+    if len(input_numbers) < 2:
+        return
+
+    vertex_count = input_numbers[0]
+    edge_count = input_numbers[1]
+    ledger_numbers = input_numbers
+    ledger_edge_count = edge_count
+    if options.compact:
+        with profiler.phase("compact") as record:
+            ledger_numbers = compact_edges(
+                vertex_count,
+                edge_count,
+                input_numbers,
+            )
+            if ledger_numbers is not None:
+                ledger_edge_count = ledger_numbers[1]
+            record.update(edges=edge_count, unique_edges=ledger_edge_count)
 
-    if len(set(shadow_list)) != vertex_count:
-        sys.stdout.write("-1")
+    if options.components:
+        # A contradiction found while compacting still deserves a report
+        # per component, so fall back to the edges as given.
+        if ledger_numbers is None:
+            ledger_numbers = input_numbers
+            ledger_edge_count = edge_count
+        with profiler.phase("components") as record:
+            reports, merge_status, ranks = solve_components(
+                vertex_count,
+                ledger_edge_count,
+                ledger_numbers,
+            )
+            record.update(
+                vertices=vertex_count,
+                edges=ledger_edge_count,
+                components=len(reports),
+                merge=merge_status,
+            )
+        with profiler.phase("output") as record:
+            answer = b""
+            if merge_status != MERGE_UNDECIDED:
+                answer = format_answer(ranks)
+                sys.stdout.buffer.write(answer)
+            record["bytes"] = len(answer)
+        profiler.emit(sys.stderr)
+        for index, report in enumerate(reports, start=1):
+            sys.stderr.write(format_component_report(index, report) + "\n")
+        if merge_status == MERGE_UNDECIDED:
+            merge_status += f" (step budget of {MERGE_STEP_BUDGET} exhausted)"
+        sys.stderr.write(f"merge: {merge_status}\n")
         return
 
-    shift = 1 - minimum_shadow
-    ranks = [value + shift for value in shadow_list]
+    # A contradiction found while compacting leaves nothing to solve.
+    ranks = None
+    if ledger_numbers is not None:
+        ranks = solve_ledger(
+            vertex_count,
+            ledger_edge_count,
+            ledger_numbers,
+            engine=options.engine,
+            graph_format=options.graph,
+            profiler=profiler,
+        )
+    with profiler.phase("output") as record:
+        answer = format_answer(ranks)
+        sys.stdout.buffer.write(answer)
+        record["bytes"] = len(answer)
+    if cache is not None:
+        cache.put(cache_key, answer)
+    profiler.emit(sys.stderr)
 
-    sys.stdout.write(" ".join(map(str, ranks)))
+    if ranks is None and options.diagnose:
+        certificate = find_conflict_certificate(
+            vertex_count,
+            build_csr_graph(vertex_count, edge_count, input_numbers),
+        )
+        if certificate is not None:
+            sys.stderr.write(format_certificate(certificate) + "\n")
 
 
 if __name__ == "__main__":